@@ -0,0 +1,54 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Images per second through the batch handler for different worker counts,
+# compared with calling app.lambda_handler once per image. The API Gateway and
+# invocation overhead saved by batching comes on top of these numbers.
+#
+#   python benchmarks/bench_batch.py [items] [side] [mime_type]
+
+import contextlib
+import io
+import json
+import os
+import sys
+from base64 import b64encode
+
+from common import best_of, make_event
+
+import app
+import batch
+
+def main(items=200,side=256,mime_type="image/png"):
+    event = make_event(query={"w": side, "h": side}, headers={"accept": mime_type})
+    body  = json.dumps({"items": [{"w": side, "h": side, "format": mime_type}] * items}).encode('utf-8')
+    batch_event = make_event("POST",
+        headers={"accept": "application/zip", "content-type": "application/json"},
+        body=b64encode(body).decode('ascii'), is_base64=True)
+
+    print(f"{items} x {side}x{side} {mime_type}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = best_of(lambda: [app.lambda_handler(event, None) for _ in range(items)], repeat=1)
+    print(f"{'single':<10} {items/seconds:>9.1f} images/s")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        batch.batch_workers = workers
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = best_of(lambda: batch.lambda_handler(batch_event, None), repeat=1)
+        print(f"{'batch x' + str(workers):<10} {items/seconds:>9.1f} images/s")
+        workers *= 2
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]], *sys.argv[3:4])
@@ -0,0 +1,87 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Cold start cost of the noise function: module import time from
+# python -X importtime, and the latency of the first invocation of each kind in
+# a fresh interpreter, with and without PREWARM.
+#
+#   python benchmarks/bench_coldstart.py [top]
+
+import json
+import os
+import subprocess
+import sys
+
+from common import CODE_DIRS, SAM_DIR
+
+IMG_API_DIR = os.path.join(SAM_DIR, "img_api")
+
+# Lambda puts layer code on the path too
+ENV = dict(os.environ, PYTHONPATH=os.pathsep.join(CODE_DIRS))
+
+# Runs in a fresh interpreter so nothing is imported or initialised yet
+FIRST_INVOKE = '''
+import json, sys, time, contextlib, io
+start = time.perf_counter()
+import app
+timings = {"import": time.perf_counter() - start}
+events = {
+    "GET":     {"headers": {"accept": "image/jpeg"}, "requestContext": {"http": {"method": "GET"}}},
+    "OPTIONS": {"headers": {"accept": "image/png"}, "requestContext": {"http": {"method": "OPTIONS"}}},
+    "POST":    {"headers": {"accept": "image/gif", "content-type": "text/plain"},
+                "requestContext": {"http": {"method": "POST"}}, "body": "Hello\\nWorld"},
+}
+for name, event in events.items():
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        app.lambda_handler(event, None)
+        timings[name] = time.perf_counter() - start
+print(json.dumps(timings))
+'''
+
+def import_times(top):
+    # -X importtime writes "import time: self | cumulative | name" lines to stderr
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=IMG_API_DIR, env=ENV, capture_output=True, text=True, check=True
+        ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), int(own), name.rstrip()))
+    total = next(cumulative for cumulative, _, name in rows if name.strip() == "app")
+    print(f"import app: {total/1000:.1f} ms, slowest imports by cumulative time:")
+    for cumulative, own, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative/1000:>8.1f} ms {own/1000:>8.1f} ms self  {name}")
+
+def first_invoke(prewarm):
+    env = dict(ENV, PREWARM=prewarm)
+    stdout = subprocess.run(
+        [sys.executable, "-c", FIRST_INVOKE],
+        cwd=IMG_API_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+    timings = json.loads(stdout.splitlines()[-1])
+    print(f"PREWARM={prewarm}: " + ", ".join(f"{name} {seconds*1000:.1f} ms" for name, seconds in timings.items()))
+
+def main(top=15):
+    import_times(top)
+    print("first invocation in a fresh interpreter:")
+    first_invoke("0")
+    first_invoke("1")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,54 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Time of overlay_noise_on_image per compositing engine, mode and image size
+# from 1 to 50 megapixels. Noise generation is included, it is the same for
+# every engine and shows what share of the overlay compositing is.
+#
+#   python benchmarks/bench_composite.py [megapixels ...]
+
+import math
+import sys
+
+from common import best_of
+
+from PIL import Image
+
+import app
+import composite
+
+MEGAPIXELS = [1, 5, 10, 25, 50]
+MODES      = ["L", "RGB", "RGBA"]
+
+def main(megapixels=MEGAPIXELS):
+    engines = sorted(composite.engines)
+    print(f"{'MP':>4} {'mode':<5} {'noise ms':>9} " + " ".join(f"{engine + ' ms':>10}" for engine in engines))
+    for size in megapixels:
+        width  = int(math.sqrt(size * 1e6 * 4 / 3))
+        height = int(size * 1e6 / width)
+        noise_only = best_of(lambda: [app.generate_noise_bytes(width, rows, 0, 255, 1, top * width)
+                                      for top in range(0, height, app.overlay_band_rows)
+                                      for rows in [min(app.overlay_band_rows, height - top)]], repeat=2)
+        for mode in MODES:
+            image = Image.new(mode, (width, height), 128)
+            timings = []
+            for engine in engines:
+                composite.engine_default = engine
+                timings.append(best_of(lambda: app.overlay_noise_on_image(image, 0, 255, seed=1), repeat=2))
+            print(f"{size:>4} {mode:<5} {noise_only * 1000:>9.1f} " + " ".join(f"{t * 1000:>10.1f}" for t in timings))
+            del image
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or MEGAPIXELS)
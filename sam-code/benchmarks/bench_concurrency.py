@@ -0,0 +1,85 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Requests per second and latency percentiles through the asyncio emulator for
+# different worker pool sizes and client concurrency. Each client keeps one
+# keep-alive connection open, so the numbers show handler contention rather than
+# connection setup. Run with --processes to see scaling past the GIL.
+#
+#   python benchmarks/bench_concurrency.py [--requests 200] [--side 512] [--processes]
+
+import argparse
+import asyncio
+import re
+import subprocess
+import sys
+import time
+from threading import Thread
+
+from common import SAM_DIR
+
+async def client(port,request,count,latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1",port)
+    for _ in range(count):
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(re.search(rb"Content-Length: (\d+)", head).group(1))
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def drive(port,request,clients,total):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port,request,total // clients,latencies) for _ in range(clients)))
+    return time.perf_counter() - start, sorted(latencies)
+
+def start_emulator(workers,processes):
+    command = [sys.executable, "-m", "local_api.emulator", "--port", "0", "--workers", str(workers)]
+    if processes:
+        command.append("--processes")
+    proc = subprocess.Popen(command, cwd=SAM_DIR, stdout=subprocess.PIPE, text=True)
+    port = int(re.search(r":(\d+)/", proc.stdout.readline()).group(1))
+    # Handlers log to stdout, keep draining it so they never block on a full pipe
+    Thread(target=proc.stdout.read, daemon=True).start()
+    return proc, port
+
+def main(total=200,side=512,processes=False,workers=(1,2,4,8),concurrency=(1,4,16)):
+    request = (f"GET /prod/noise?w={side}&h={side} HTTP/1.1\r\nHost: localhost\r\n"
+               f"Accept: image/png\r\n\r\n").encode('latin-1')
+    print(f"{'workers':>7} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for count in workers:
+        proc, port = start_emulator(count,processes)
+        try:
+            # Warm the worker imports before timing
+            asyncio.run(drive(port,request,count,count))
+            for clients in concurrency:
+                elapsed, latencies = asyncio.run(drive(port,request,clients,total))
+                pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+                print(f"{count:>7} {clients:>7} {len(latencies) / elapsed:>8.1f} "
+                      f"{pick(0.50):>8.2f} {pick(0.95):>8.2f} {pick(0.99):>8.2f}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--side", type=int, default=512)
+    parser.add_argument("--processes", action="store_true")
+    args = parser.parse_args()
+    main(args.requests,args.side,args.processes)
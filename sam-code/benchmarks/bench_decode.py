@@ -0,0 +1,69 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Decoding an upload straight to the requested size with JPEG draft mode compared
+# with a full resolution decode followed by a resize. Uses testdata/rainbow-small.jpg
+# and synthetic photos. Each measurement runs in its own process.
+#
+#   python benchmarks/bench_decode.py [target_width]
+
+import os
+import subprocess
+import sys
+from io import BytesIO
+
+from common import TESTDATA_DIR, best_of, reset_peak_rss, rss_kib
+
+import app
+from PIL import Image
+
+SOURCES = ["rainbow-small.jpg", "4000x3000", "8000x6000"]
+
+def load_source(source):
+    if source.endswith(".jpg"):
+        with open(os.path.join(TESTDATA_DIR,source),"rb") as fh:
+            return fh.read()
+    size = tuple(int(side) for side in source.split("x"))
+    img_buffer = BytesIO()
+    Image.radial_gradient('L').resize(size).convert('RGB').save(img_buffer,format="JPEG")
+    return img_buffer.getvalue()
+
+def full_decode(img_data,width):
+    image = Image.open(BytesIO(img_data))
+    return image.resize(app.fit_size(image.size,(width,None)),Image.LANCZOS)
+
+def draft_decode(img_data,width):
+    return app.decode_img(img_data,'image/jpeg',0,0,(width,None))
+
+paths = { "full": full_decode, "draft": draft_decode }
+
+def child(path,source,width):
+    img_data = load_source(source)
+    baseline = reset_peak_rss()
+    seconds = best_of(lambda: paths[path](img_data,width))
+    peak = rss_kib("VmHWM")
+    print(f"{source:<18} {path:<6} {width:>6} {seconds*1000:>9.1f} ms {(peak-baseline)/1024:>8.1f} MiB")
+
+def main(width=512):
+    print(f"{'source':<18} {'path':<6} {'width':>6}")
+    for source in SOURCES:
+        for path in paths:
+            subprocess.run([sys.executable, __file__, "--child", path, source, str(width)], check=True)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
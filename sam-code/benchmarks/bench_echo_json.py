@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# CPU time and peak traced memory of serializing echo_json events with base64
+# bodies from 1 KB to 6 MB: json.dumps of the whole event as before, the
+# spliced serializer with the stdlib and orjson backends, and with bodies
+# summarized past ECHO_JSON_MAX_BODY=4096.
+#
+#   python benchmarks/bench_echo_json.py [repeat]
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from base64 import b64encode
+
+from common import make_event
+
+import echo_json
+
+SIZES = (1 << 10, 64 << 10, 1 << 20, 6 << 20)
+
+def serialize(event):
+    return "".join(echo_json.iter_json(event))
+
+def use_backend(name,max_body=0):
+    if name == "json":
+        echo_json.orjson = None
+        echo_json.item_separator, echo_json.key_separator = ", ", ": "
+    else:
+        import orjson
+        echo_json.orjson = orjson
+        echo_json.item_separator, echo_json.key_separator = ",", ":"
+    echo_json.max_body = max_body
+
+def measure(func,repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    cpu = (time.process_time() - start) / repeat * 1000
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return cpu, peak
+
+def main(repeat=20):
+    variants = [("json.dumps", None, 0), ("splice json", "json", 0), ("splice orjson", "orjson", 0),
+                ("summary 4KB", "orjson", 4096)]
+    try:
+        import orjson
+    except ImportError:
+        variants = [variant for variant in variants if variant[1] != "orjson"]
+    print(f"{'size':>8} {'variant':<14} {'cpu ms':>8} {'peak MiB':>9}")
+    for size in SIZES:
+        event = make_event("POST",headers={"content-type": "image/gif"},
+                           body=b64encode(os.urandom(size)).decode('ascii'),is_base64=True)
+        for label, backend, max_body in variants:
+            if backend is None:
+                func = lambda: json.dumps(event)
+            else:
+                use_backend(backend,max_body)
+                func = lambda: serialize(event)
+            cpu, peak = measure(func,repeat)
+            print(f"{size >> 10:>6}KB {label:<14} {cpu:>8.3f} {peak / 2**20:>9.2f}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,61 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Encode time against output bytes for every format app can negotiate, on a
+# noise tile, the test photo with noise overlaid and rendered text, plus a few
+# quality and effort settings for the lossy formats.
+#
+#   python benchmarks/bench_formats.py [width] [height]
+
+import os
+import sys
+
+from common import TESTDATA_DIR, best_of
+
+import app
+import encoder
+import text_render
+
+SETTINGS = {
+    "JPEG": [{"quality": 50}, {"quality": 90}],
+    "WEBP": [{"quality": 50}, {"method": 0}, {"method": 6}],
+    "AVIF": [{"quality": 50}, {"speed": 10}, {"speed": 2}],
+}
+
+def samples(width,height):
+    with open(os.path.join(TESTDATA_DIR,'rainbow-small.jpg'),'rb') as fh:
+        photo = app.decode_img(fh.read(),"image/jpeg",width,height,(width,height))
+    with open(os.path.join(TESTDATA_DIR,'multiline.txt')) as fh:
+        text = text_render.render(fh.read(),width,height).convert('RGB')
+    return [
+        ("noise", app.generate_noise_img(width,height,seed=1)),
+        ("photo", app.overlay_noise_on_image(photo,0,64,seed=1)),
+        ("text",  text),
+    ]
+
+def main(width=512,height=256):
+    formats = sorted(set(app.known_conversions.values()))
+    print(f"{width}x{height}, formats: {', '.join(formats)}")
+    print(f"{'image':<6} {'format':<6} {'options':<18} {'ms':>8} {'bytes':>9}")
+    for label, image in samples(width,height):
+        for format in formats:
+            for options in [{}] + SETTINGS.get(format,[]):
+                size = len(encoder.encode_view(image,format,**options))
+                seconds = best_of(lambda: encoder.encode_view(image,format,**options))
+                settings = ",".join(f"{key}={value}" for key, value in options.items()) or "default"
+                print(f"{label:<6} {format:<6} {settings:<18} {seconds * 1000:>8.2f} {size:>9}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
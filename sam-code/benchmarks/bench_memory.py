@@ -0,0 +1,64 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Peak RSS of encoding a large noise image and base64 encoding the response body,
+# comparing the previous copy-based path with the memoryview path in encoder.py.
+# Each measurement runs in its own process, and on Linux the RSS high water mark is
+# reset once the test image exists so only the encode path is measured.
+#
+#   python benchmarks/bench_memory.py [side ...]
+
+import subprocess
+import sys
+from base64 import b64encode
+from io     import BytesIO
+
+from common import best_of, reset_peak_rss, rss_kib
+
+import encoder
+import noise
+from PIL import Image
+
+def copy_path(image):
+    img_buffer = BytesIO()
+    image.save(img_buffer,format="PNG")
+    img_binary = img_buffer.getvalue()
+    img_buffer.close()
+    return b64encode(img_binary).decode('ascii')
+
+def view_path(image):
+    return encoder.b64encode_view(encoder.encode_view(image,"PNG"))
+
+paths = { "copy": copy_path, "view": view_path }
+
+def child(path,side):
+    image = Image.frombuffer('L',(side,side),noise.noise_bytes(side*side),"raw","L",0,1)
+    # First call is a cold container, second a warm one that can reuse buffers
+    for state in ("cold","warm"):
+        baseline = reset_peak_rss()
+        seconds = best_of(lambda: paths[path](image), repeat=1)
+        peak = rss_kib("VmHWM")
+        print(f"{path:<5} {state:<5} {side:>5}x{side:<5} {seconds:>8.3f}s {(peak-baseline)/1024:>9.1f} MiB above baseline")
+
+def main(sides):
+    for side in sides:
+        for path in paths:
+            subprocess.run([sys.executable, __file__, "--child", path, str(side)], check=True)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or [1024, 2048, 4096])
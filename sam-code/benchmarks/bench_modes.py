@@ -0,0 +1,70 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Cost of expanding single channel images to RGB. For a greyscale GIF upload
+# and a text body, times decode, overlay and encode per output format the old
+# way (everything converted to RGB) and the mode-aware way, with output bytes.
+#
+#   python benchmarks/bench_modes.py [width] [height]
+
+import sys
+from io import BytesIO
+
+from common import best_of
+
+from PIL import Image
+
+import app
+import encoder
+import text_render
+
+def grey_gif(width,height):
+    # Greyscale palette GIF like a scanned document, stored as mode P
+    image = Image.linear_gradient('L').resize((width,height)).convert('P')
+    img_buffer = BytesIO()
+    image.save(img_buffer,format="GIF")
+    return img_buffer.getvalue()
+
+def rgb_pipeline(decode,format):
+    image = decode().convert('RGB')
+    image = app.overlay_noise_on_image(image,0,64,seed=1)
+    return encoder.encode_view(image,format)
+
+def mode_pipeline(decode,format):
+    image = decode()
+    image = image.convert(app.working_mode(image))
+    image = app.overlay_noise_on_image(image,0,64,seed=1)
+    return encoder.encode_view(app.output_image(image,format),format)
+
+def main(width=1024,height=768):
+    gif = grey_gif(width,height)
+    with open(__file__) as fh:
+        text = fh.read()[:4000]
+    inputs = [
+        ("grey gif", lambda: Image.open(BytesIO(gif))),
+        ("text",     lambda: text_render.render(text,width,height)),
+    ]
+    print(f"{width}x{height}")
+    print(f"{'input':<9} {'format':<6} {'rgb ms':>8} {'rgb bytes':>10} {'mode ms':>8} {'mode bytes':>11}")
+    for label, decode in inputs:
+        for format in sorted(set(app.known_conversions.values())):
+            row = []
+            for pipeline in (rgb_pipeline, mode_pipeline):
+                size = len(pipeline(decode,format))
+                row += [best_of(lambda: pipeline(decode,format)) * 1000, size]
+            print(f"{label:<9} {format:<6} {row[0]:>8.2f} {row[1]:>10} {row[2]:>8.2f} {row[3]:>11}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,40 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Compare noise generation throughput of the available engines
+#
+#   python benchmarks/bench_noise.py [max_side]
+
+import sys
+
+from common import best_of
+
+import noise
+
+def main(max_side=4096):
+    print(f"{'engine':<8} {'size':>11} {'seconds':>9} {'MPx/s':>9}")
+    side = 256
+    while side <= max_side:
+        for engine in sorted(noise.engines):
+            # The per-pixel reference gets too slow to be useful beyond a few megapixels
+            if engine == "python" and side > 1024:
+                continue
+            buf = bytearray(side*side)
+            seconds = best_of(lambda: noise.fill_noise(buf,0,255,engine=engine))
+            print(f"{engine:<8} {side:>5}x{side:<5} {seconds:>9.4f} {side*side/1e6/seconds:>9.1f}")
+        side *= 2
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,56 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Peak RSS and time of the POST overlay for different OVERLAY_BAND_ROWS values on a
+# large synthetic photo. Each measurement runs in its own process.
+#
+#   python benchmarks/bench_overlay.py [width height]
+
+import subprocess
+import sys
+from io import BytesIO
+
+from common import best_of, reset_peak_rss, rss_kib
+
+import app
+from PIL import Image
+
+BAND_ROWS = [0, 1024, 256, 64]
+
+def synthetic_jpeg(width,height):
+    image = Image.linear_gradient('L').resize((width,height)).convert('RGB')
+    img_buffer = BytesIO()
+    image.save(img_buffer,format="JPEG")
+    return img_buffer.getvalue()
+
+def child(band_rows,width,height):
+    img_data = synthetic_jpeg(width,height)
+    baseline = reset_peak_rss()
+    seconds = best_of(
+        lambda: app.overlay_noise_on_image(app.decode_img(img_data,'image/jpeg',0,0),band_rows=band_rows),
+        repeat=1)
+    peak = rss_kib("VmHWM")
+    print(f"{band_rows:>9} {width:>5}x{height:<5} {seconds:>8.3f}s {(peak-baseline)/1024:>9.1f} MiB above baseline")
+
+def main(width=6000,height=4000):
+    print(f"{'band rows':>9} {'size':>11}  (0 is full frame)")
+    for band_rows in BAND_ROWS:
+        subprocess.run([sys.executable, __file__, "--child", str(band_rows), str(width), str(height)], check=True)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(*[int(arg) for arg in sys.argv[2:]])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# PNG encode time and size for Pillow's encoder and the parallel row group encoder
+# at growing worker counts, on noise and on a smooth gradient.
+#
+#   python benchmarks/bench_parallel_encode.py [side] [max_workers]
+
+import os
+import sys
+
+from common import best_of
+
+import encoder
+import noise
+from PIL import Image
+
+def images(side):
+    yield "noise", Image.frombuffer('L',(side,side),noise.noise_bytes(side*side),"raw","L",0,1).convert('RGB')
+    yield "gradient", Image.radial_gradient('L').resize((side,side)).convert('RGB')
+
+def main(side=4096,max_workers=os.cpu_count() or 1):
+    print(f"{'image':<9} {'encoder':<11} {'seconds':>8} {'MPx/s':>8} {'bytes':>10}")
+    for name, image in images(side):
+        def pillow():
+            encoder.encode_view(image,"PNG",optimize=False)
+        seconds = best_of(pillow)
+        nbytes = len(encoder.encode_view(image,"PNG",optimize=False))
+        print(f"{name:<9} {'pillow':<11} {seconds:>8.3f} {side*side/1e6/seconds:>8.1f} {nbytes:>10}")
+        workers = 1
+        while workers <= max_workers:
+            seconds = best_of(lambda: encoder.encode_png_parallel(image,workers))
+            nbytes = len(encoder.encode_png_parallel(image,workers))
+            print(f"{name:<9} {'parallel x' + str(workers):<11} {seconds:>8.3f} {side*side/1e6/seconds:>8.1f} {nbytes:>10}")
+            workers *= 2
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,60 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Time to first byte of app.stream_handler compared with the buffered
+# app.lambda_handler, where the first byte is only available once the whole
+# response exists. The stand-in consumes the body generator like the streaming
+# runtime integration would.
+#
+#   python benchmarks/bench_stream.py [side ...]
+
+import contextlib
+import io
+import sys
+import time
+
+from common import make_event
+
+import app
+
+def consume(response):
+    # Returns (seconds to first byte, total seconds, bytes) for a streamed response
+    start = time.perf_counter()
+    first = None
+    total = 0
+    for chunk in response["body"]:
+        if first is None:
+            first = time.perf_counter() - start
+        total += len(chunk)
+    return first, time.perf_counter() - start, total
+
+def main(sides):
+    print(f"{'format':<10} {'size':>11} {'buffered':>9} {'ttfb':>9} {'stream':>9} {'bytes':>10}")
+    for mime_type in ("image/png","image/jpeg","image/bmp"):
+        for side in sides:
+            event = make_event(query={"w": side, "h": side}, headers={"accept": mime_type})
+            # The handlers print the event, keep that out of the output
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                app.lambda_handler(event, None)
+                buffered = time.perf_counter() - start
+                start = time.perf_counter()
+                response = app.stream_handler(event, None)
+                first, total, nbytes = consume(response)
+                setup = time.perf_counter() - start - total
+            print(f"{mime_type:<10} {side:>5}x{side:<5} {buffered:>9.3f} {setup+first:>9.3f} {setup+total:>9.3f} {nbytes:>10}")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [512, 2048, 4096])
@@ -0,0 +1,54 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Text rendering time of ImageDraw.multiline_text on the old fixed canvas
+# against text_render with a cold and a warm glyph atlas, for
+# testdata/multiline.txt and a 1 MB corpus built from it. The old path lays out
+# the whole document even though most of it is cropped away.
+#
+#   python benchmarks/bench_text.py [width] [height]
+
+import os
+import sys
+
+from common import TESTDATA_DIR, best_of
+
+from PIL import Image, ImageDraw, ImageFont
+
+import text_render
+
+def multiline_text(text,width,height,font):
+    image = Image.new("RGB",(width,height),(255,255,255))
+    ImageDraw.Draw(image).multiline_text((0,0),text,fill=(0,0,0),font=font)
+    return image
+
+def main(width=512,height=256):
+    with open(os.path.join(TESTDATA_DIR,'multiline.txt')) as fh:
+        sample = fh.read()
+    corpus = (sample * ((1 << 20) // len(sample) + 1))[:1 << 20]
+    font = ImageFont.load_default()
+    print(f"{width}x{height} canvas, text_render height limit {text_render.max_height}")
+    print(f"{'text':<14} {'multiline ms':>13} {'cold ms':>9} {'warm ms':>9} {'rendered':>10}")
+    for label, text in (("multiline.txt", sample), ("1 MB corpus", corpus)):
+        old  = best_of(lambda: multiline_text(text,width,height,font),repeat=1 if len(text) > 1e5 else 3)
+        cold = best_of(lambda: text_render.render(text,width,height,text_render.GlyphAtlas(font)))
+        atlas = text_render.GlyphAtlas(font)
+        image = text_render.render(text,width,height,atlas)
+        warm = best_of(lambda: text_render.render(text,width,height,atlas))
+        print(f"{label:<14} {old * 1000:>13.2f} {cold * 1000:>9.2f} {warm * 1000:>9.2f} "
+              f"{'x'.join(map(str,image.size)):>10}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
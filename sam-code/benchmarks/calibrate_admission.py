@@ -0,0 +1,86 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Fits the admission cost model to a harness.py results file. For every output
+# format, the get:<mime>:<side> workloads give a least squares line of p50
+# latency against pixels, the response bytes per pixel and the peak memory per
+# pixel. The fixtures give the memory of a warm container. The JSON printed, or
+# written with --output, can be shipped as the ADMISSION_MODEL file. Calibrate
+# on one full core, admission scales CPU time by the function's memory share.
+# Only workloads that returned 200 are fitted, run the harness with --calibrate
+# so admission control doesn't reject the large sizes.
+#
+#   python benchmarks/harness.py --calibrate --output results.json
+#   python benchmarks/calibrate_admission.py results.json [--output model.json]
+
+import argparse
+import json
+
+# Puts the function code on sys.path
+import common
+
+import admission
+import app
+
+def fit_line(points):
+    # Least squares intercept and slope of (x, y) points
+    count  = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    slope  = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else 0.0
+    return mean_y - slope * mean_x, slope
+
+def calibrate(results):
+    model = json.loads(json.dumps(admission.DEFAULT_MODEL))
+    intercepts = []
+    for mime_type, format in app.known_conversions.items():
+        samples = [result for result in results
+                   if result["name"].startswith(f"get:{mime_type}:") and result["statuses"] == [200]]
+        if len(samples) < 2:
+            continue
+        points = [(int(result["name"].rsplit(":",1)[1]) ** 2, result) for result in samples]
+        intercept, slope = fit_line([(pixels, result["p50_ms"]) for pixels, result in points])
+        intercepts.append(intercept)
+        largest = max(points, key=lambda point: point[0])
+        peak = max(result["peak_rss_delta_mib"] * 2**20 / pixels for pixels, result in points)
+        model["formats"][format] = {
+            "ns_per_pixel":        round(max(slope,0.0) * 1e6, 3),
+            "out_bytes_per_pixel": round(largest[1]["bytes_per_image"] / largest[0], 4),
+            "peak_bytes_per_pixel": round(max(peak, model["formats"].get(format,{}).get("peak_bytes_per_pixel",0)), 3),
+        }
+    # Resident memory of a warm container before any large image
+    fixtures = [result["peak_rss_mib"] for result in results if result["name"].startswith("fixture:")]
+    if fixtures:
+        model["base_bytes"] = int(max(fixtures) * 2**20)
+    if intercepts:
+        model["fixed_ms"] = round(max(min(intercepts),0.0) + 1.0, 3)
+    return model
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("results")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    with open(args.results) as fh:
+        model = calibrate(json.load(fh)["results"])
+    text = json.dumps(model, indent=2)
+    if args.output:
+        with open(args.output,"w") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
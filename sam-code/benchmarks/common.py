@@ -0,0 +1,63 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import sys
+import time
+
+# Benchmarks run from the command line, make the function code importable the
+# same way Lambda sees it
+SAM_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+CODE_DIRS = [os.path.join(SAM_DIR, code_dir) for code_dir in ("img_api","echo_api","instrument_layer")]
+sys.path[:0] = CODE_DIRS + [SAM_DIR]
+
+TESTDATA_DIR = os.path.realpath(os.path.join(SAM_DIR, '..', 'testdata'))
+
+def best_of(func, repeat=3):
+    # Return the fastest wall clock time of several runs in seconds
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def rss_kib(field):
+    # Read a memory field such as VmRSS or VmHWM of this process, Linux only
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS, returns that RSS
+    with open("/proc/self/clear_refs","w") as fh:
+        fh.write("5")
+    return rss_kib("VmRSS")
+
+def make_event(method="GET",query=None,headers=None,body=None,is_base64=False):
+    # Minimal HTTP API payload format 2.0 event, enough for the handlers
+    event = {
+        "version": "2.0",
+        "routeKey": f"{method} /noise",
+        "rawPath": "/prod/noise",
+        "headers": headers or {},
+        "queryStringParameters": {key: str(value) for key, value in (query or {}).items()},
+        "requestContext": { "http": { "method": method, "path": "/prod/noise" } },
+        "isBase64Encoded": is_base64,
+    }
+    if body is not None:
+        event["body"] = body
+    return event
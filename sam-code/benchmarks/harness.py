@@ -0,0 +1,210 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+# Throughput and latency benchmark for the noise function without deploying it.
+# Replays the events/ fixtures and a sweep of image sizes and formats, either
+# calling lambda_handler in-process or over HTTP through the local API Gateway
+# stand-in in local_api/gateway.py. Results are written as JSON so runs can be
+# compared over time. Workloads that don't return 200, like sizes admission
+# control rejects, are flagged and left out of the throughput figures. Pass
+# --calibrate to turn admission control off so every size is measured, which
+# benchmarks/calibrate_admission.py needs.
+#
+#   python benchmarks/harness.py [--mode inprocess|http] [--sizes 64,256,...]
+#                                [--requests N] [--output results.json] [--calibrate]
+#   python benchmarks/harness.py --compare old.json new.json
+
+import argparse
+import contextlib
+import glob
+import http.client
+import io
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+from common import SAM_DIR, make_event, reset_peak_rss, rss_kib
+
+import admission
+import app
+from local_api import gateway
+
+EVENTS_DIR  = os.path.join(SAM_DIR, "events")
+RESULTS_DIR = os.path.join(SAM_DIR, "benchmarks", "results")
+
+SIZES = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+def percentile(values,fraction):
+    # Nearest rank percentile of a non-empty list
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+def workloads(sizes):
+    # (name, event) pairs: every fixture, then every size in every output format
+    for path in sorted(glob.glob(os.path.join(EVENTS_DIR, "*.json"))):
+        with open(path) as fh:
+            yield "fixture:" + os.path.basename(path), json.load(fh)
+    for mime_type in sorted(set(app.known_conversions) - {"image/apng"}):
+        for side in sizes:
+            yield f"get:{mime_type}:{side}", make_event(query={"w": side, "h": side}, headers={"accept": mime_type})
+
+class InProcess:
+    def __init__(self):
+        self.handler = app.lambda_handler
+
+    def __call__(self,event):
+        # The handlers log every request, keep that out of the timings
+        with contextlib.redirect_stdout(io.StringIO()):
+            response = self.handler(event, None)
+        return response["statusCode"], len(response["body"])
+
+    def close(self):
+        pass
+
+class OverHttp:
+    # Keep-alive client against the local stand-in running in a thread
+    def __init__(self):
+        self.server = gateway.serve(port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection(*self.server.server_address)
+
+    def __call__(self,event):
+        query = "&".join(f"{name}={value}" for name, value in event.get("queryStringParameters",{}).items())
+        headers = { name: value for name, value in event.get("headers",{}).items()
+                    if name not in ("content-length", "host") }
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.connection.request(
+                event.get("requestContext",{}).get("http",{}).get("method","GET"),
+                "/prod/noise" + ("?" + query if query else ""),
+                body=event.get("body"), headers=headers)
+            response = self.connection.getresponse()
+            body = response.read()
+        return response.status, len(body)
+
+    def close(self):
+        self.connection.close()
+        self.server.shutdown()
+
+def requests_for(name,requests):
+    # Large images take long enough that a few samples are plenty
+    side = int(name.rsplit(":",1)[1]) if name.startswith("get:") else 0
+    return max(3, requests // max(1, (side * side) // (512 * 512)))
+
+def run(mode,sizes,requests,calibrate=False):
+    # The stand-in gateway runs in this process, so this covers both modes
+    admission_flag = admission.enabled_flag
+    if calibrate:
+        admission.enabled_flag = False
+    client = InProcess() if mode == "inprocess" else OverHttp()
+    results = []
+    try:
+        for name, event in workloads(sizes):
+            count = requests_for(name,requests)
+            # One untimed warm up call, the way a warm container would see it
+            client(event)
+            baseline = reset_peak_rss()
+            latencies = []
+            statuses = set()
+            nbytes = 0
+            start = time.perf_counter()
+            for _ in range(count):
+                request_start = time.perf_counter()
+                status, size = client(event)
+                latencies.append((time.perf_counter() - request_start) * 1000)
+                statuses.add(status)
+                nbytes += size
+            elapsed = time.perf_counter() - start
+            result = {
+                "name":            name,
+                "requests":        count,
+                "statuses":        sorted(statuses),
+                "p50_ms":          round(percentile(latencies,0.50),3),
+                "p95_ms":          round(percentile(latencies,0.95),3),
+                "p99_ms":          round(percentile(latencies,0.99),3),
+                "images_per_sec":  round(count / elapsed,2),
+                "bytes_per_image": nbytes // count,
+                "peak_rss_mib":    round(rss_kib("VmHWM") / 1024,1),
+                "peak_rss_delta_mib": round((rss_kib("VmHWM") - baseline) / 1024,1),
+            }
+            if result["statuses"] != [200]:
+                # Rejected or failed, the timings are not those of the workload
+                result["rejected"] = True
+                result["images_per_sec"] = 0
+                print(f"{name:<55} status {','.join(str(status) for status in result['statuses'])}, skipped")
+            else:
+                print(f"{name:<55} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+                      f"{result['images_per_sec']:>8.1f} img/s  {result['peak_rss_delta_mib']:>7.1f} MiB")
+            results.append(result)
+    finally:
+        client.close()
+        admission.enabled_flag = admission_flag
+    return results
+
+def metadata(mode,calibrate=False):
+    try:
+        commit = subprocess.run(["git","rev-parse","HEAD"], cwd=SAM_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "mode":      mode,
+        "admission": admission.enabled_flag and not calibrate,
+        "commit":    commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python":    platform.python_version(),
+        "platform":  platform.platform(),
+        "cpus":      os.cpu_count(),
+    }
+
+def compare(old_file,new_file):
+    with open(old_file) as fh:
+        old = { result["name"]: result for result in json.load(fh)["results"] }
+    with open(new_file) as fh:
+        new = { result["name"]: result for result in json.load(fh)["results"] }
+    print(f"{'workload':<55} {'p50 old':>9} {'p50 new':>9} {'change':>8}")
+    for name in new:
+        if new[name].get("rejected") or old.get(name,{}).get("rejected"):
+            continue
+        if name in old and old[name]["p50_ms"] > 0:
+            change = (new[name]["p50_ms"] / old[name]["p50_ms"] - 1) * 100
+            print(f"{name:<55} {old[name]['p50_ms']:>9.2f} {new[name]['p50_ms']:>9.2f} {change:>+7.1f}%")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["inprocess","http"], default="inprocess")
+    parser.add_argument("--sizes", default=",".join(str(side) for side in SIZES))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--output")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD","NEW"))
+    parser.add_argument("--calibrate", action="store_true",
+                        help="turn admission control off to measure every size")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = run(args.mode, [int(side) for side in args.sizes.split(",")], args.requests, args.calibrate)
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + f"-{args.mode}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output,"w") as fh:
+        json.dump({ "metadata": metadata(args.mode,args.calibrate), "results": results }, fh, indent=2)
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
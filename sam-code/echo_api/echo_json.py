@@ -14,10 +14,66 @@
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import json
+import os
 
+import instrument
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The event is echoed as JSON in pieces. The body, usually most of the event, is
+# spliced in as is when it is base64, which needs no escaping, instead of being
+# scanned and copied by the encoder. orjson serializes the rest when installed.
+#
+# ECHO_JSON_MAX_BODY - bodies longer than this many characters are cut to that
+#                      length and summarized with their full length and hash,
+#                      0 (default) echoes them whole
+max_body = int(os.environ.get("ECHO_JSON_MAX_BODY",0))
+
+# Separators of the backend, so spliced pieces match the rest of the output
+if orjson is not None:
+    item_separator, key_separator = ",", ":"
+else:
+    item_separator, key_separator = ", ", ": "
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value)
+
+def echo_body(event):
+    body = event["body"]
+    if max_body and isinstance(body,str) and len(body) > max_body:
+        summary = instrument.body_summary(body)
+        summary["truncated"] = body[:max_body]
+        return summary
+    return body
+
+def iter_json(event):
+    # Yield the event as JSON, with the body as the last key
+    rest = { key: value for key, value in event.items() if key != "body" }
+    head = dumps(rest)
+    if "body" not in event:
+        yield head
+        return
+    yield head[:-1]
+    if rest:
+        yield item_separator
+    yield '"body"' + key_separator
+    body = echo_body(event)
+    if event.get("isBase64Encoded") and isinstance(body,str):
+        yield '"'
+        yield body
+        yield '"}'
+    else:
+        yield dumps(body)
+        yield "}"
+
+@instrument.handler("echo_json")
 def lambda_handler(event, context):    
-    print(event)
     return {
         'statusCode': 200,
-        'body': json.dumps(event)
+        'body': "".join(iter_json(event))
     }
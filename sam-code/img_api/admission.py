@@ -0,0 +1,144 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+
+# Admission control. Before any pixels are generated, the CPU time, peak memory
+# and response size of a request are estimated from a linear cost model, and
+# compared with what the function can afford. A request that does not fit is
+# moved to a cheaper format the client also accepts, or rejected with the
+# estimate instead of timing out or running out of memory after billing the
+# full duration.
+#
+# ADMISSION                 - 0 disables admission control
+# ADMISSION_MODEL           - JSON file with model coefficients, made by
+#                             benchmarks/calibrate_admission.py from harness results
+# ADMISSION_HEADROOM        - fraction of the memory and remaining time to plan with
+# ADMISSION_RESPONSE_MARGIN - factor estimated response sizes are multiplied by
+
+enabled_flag    = os.environ.get("ADMISSION","1") != "0"
+headroom        = float(os.environ.get("ADMISSION_HEADROOM",0.8))
+# Encoded noise is within 2% of the linear estimate, the response also carries
+# headers. Going over the limit is a 502, so sizes are planned with a margin.
+response_margin = float(os.environ.get("ADMISSION_RESPONSE_MARGIN",1.1))
+
+# Lambda limits the synchronous response payload, base64 body included
+MAX_RESPONSE_BYTES = 6 * 1024 * 1024 - 1024
+
+# Lambda gives a function a full vCPU at this memory size, less gets a share
+FULL_CPU_MB = 1769
+
+# Coefficients measured on one full core for GET noise, a single channel image.
+# Per pixel costs are multiplied by the channels of the image being processed.
+DEFAULT_MODEL = {
+    "fixed_ms":           1.0,
+    "base_bytes":         48 * 1024 * 1024,
+    "post_ns_per_pixel":  40.0,
+    "upload_ns_per_byte": 30.0,
+    "upload_peak_factor": 4.0,
+    "formats": {
+        "JPEG": { "ns_per_pixel":   10.0, "out_bytes_per_pixel": 0.74, "peak_bytes_per_pixel": 8.0 },
+        "PNG":  { "ns_per_pixel":   72.0, "out_bytes_per_pixel": 1.34, "peak_bytes_per_pixel": 8.0 },
+        "GIF":  { "ns_per_pixel":   29.0, "out_bytes_per_pixel": 1.83, "peak_bytes_per_pixel": 8.0 },
+        "BMP":  { "ns_per_pixel":    5.2, "out_bytes_per_pixel": 1.33, "peak_bytes_per_pixel": 8.0 },
+        "WEBP": { "ns_per_pixel":  247.0, "out_bytes_per_pixel": 0.79, "peak_bytes_per_pixel": 22.0 },
+        "AVIF": { "ns_per_pixel":  755.0, "out_bytes_per_pixel": 0.77, "peak_bytes_per_pixel": 47.0 },
+    },
+}
+
+def load_model(path):
+    model = json.loads(json.dumps(DEFAULT_MODEL))
+    if path:
+        with open(path) as fh:
+            calibrated = json.load(fh)
+        model["formats"].update(calibrated.pop("formats",{}))
+        model.update(calibrated)
+    return model
+
+model = load_model(os.environ.get("ADMISSION_MODEL"))
+
+def enabled():
+    return enabled_flag
+
+def estimate(pixels,format,verb="GET",upload_bytes=0,channels=1):
+    # Expected CPU milliseconds on a full core, peak bytes and response bytes
+    coefficients = model["formats"].get(format,{})
+    cpu_ms = model["fixed_ms"] + pixels * channels * coefficients.get("ns_per_pixel",0) / 1e6
+    peak   = model["base_bytes"] + pixels * channels * coefficients.get("peak_bytes_per_pixel",0)
+    if verb == "POST":
+        cpu_ms += pixels * channels * model["post_ns_per_pixel"] / 1e6
+        cpu_ms += upload_bytes * model["upload_ns_per_byte"] / 1e6
+        peak   += upload_bytes * model["upload_peak_factor"]
+    return {
+        "format":         format,
+        "cpu_ms":         round(cpu_ms,1),
+        "peak_bytes":     int(peak),
+        "response_bytes": int(pixels * channels * coefficients.get("out_bytes_per_pixel",0)),
+    }
+
+def limits(context=None):
+    # What this invocation can afford, None where there is no known limit
+    memory_mb = int(os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE",0))
+    remaining = getattr(context,"get_remaining_time_in_millis",None)
+    return {
+        "time_ms":        int(remaining() * headroom) if callable(remaining) else None,
+        "memory_bytes":   int(memory_mb * 1024 * 1024 * headroom) if memory_mb else None,
+        "response_bytes": MAX_RESPONSE_BYTES,
+        "cpu_share":      min(memory_mb / FULL_CPU_MB,1.0) if memory_mb else 1.0,
+    }
+
+def exceeded(estimated,limit):
+    # Names of the limits the estimate does not fit in
+    over = []
+    if limit["time_ms"] is not None and estimated["cpu_ms"] / limit["cpu_share"] > limit["time_ms"]:
+        over.append("time_ms")
+    if limit["memory_bytes"] is not None and estimated["peak_bytes"] > limit["memory_bytes"]:
+        over.append("memory_bytes")
+    if estimated["response_bytes"] * response_margin > limit["response_bytes"]:
+        over.append("response_bytes")
+    return over
+
+def admit(pixels,candidates,verb="GET",upload_bytes=0,channels=1,context=None):
+    # candidates are (mime_type, format) pairs the client accepts, preferred
+    # first. Returns the first that fits, or None, with its estimate, the
+    # limits and what was exceeded by the preferred candidate otherwise.
+    limit = limits(context)
+    first = None
+    for mime_type, format in candidates:
+        estimated = estimate(pixels,format,verb,upload_bytes,channels)
+        over = exceeded(estimated,limit)
+        if not over:
+            return mime_type, estimated, limit, []
+        if first is None:
+            first = (estimated, over)
+    if first is None:
+        return None, None, limit, []
+    return None, first[0], limit, first[1]
+
+def rejection(message,estimated,limit,over):
+    # 413 when the response would be too large to return, 422 when the work
+    # does not fit in the function's time or memory
+    status = 413 if "response_bytes" in over else 422
+    body = { "message": message, "exceeded": over, "estimate": estimated, "limits": limit }
+    return {
+        'statusCode': status,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps(body),
+        'isBase64Encoded': False
+    }
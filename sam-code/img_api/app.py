@@ -13,18 +13,31 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-import json
-import re
-from io     import BytesIO
-from random import random
-from base64 import b64encode,b64decode
-from PIL    import Image, ImageFont, ImageDraw
+import os
+import string
+from importlib import import_module
+from io        import BytesIO
+from base64    import b64decode
+from PIL       import Image, features
+
+import admission
+import composite
+import encoder
+import instrument
+import negotiate
+import noise
+import result_cache
+import text_render
+import tile_cache
 
 xdim = 512
 ydim = 256
 cmin = 0
 cmax = 255
 
+# Rows of noise generated and composited at a time on POST, 0 for the full frame
+overlay_band_rows = int(os.environ.get("OVERLAY_BAND_ROWS",256))
+
 known_conversions = {
     "image/jpeg": "JPEG",
     "image/png": "PNG",
@@ -33,71 +46,302 @@ known_conversions = {
     "image/bmp": "BMP",
 }
 
-def generate_noise_bytes(xdim=50,ydim=50,cmin=0,cmax=255):
-    # Generate data - this is a substantial performance hit for larger images!
-    img_bytes = bytes([int((cmax-cmin)*random())+cmin for x in range(xdim*ydim)])
+# Smaller formats offered when this Pillow build can encode them. For GET noise
+# they are slower to encode and no smaller, see offered_types.
+# check_module raises for modules older Pillow releases don't know, like avif
+# before 11.2, get_supported_modules just leaves them out.
+supported_modules = features.get_supported_modules()
+if "webp" in supported_modules:
+    known_conversions["image/webp"] = "WEBP"
+if "avif" in supported_modules:
+    known_conversions["image/avif"] = "AVIF"
+
+# Mime types in the order we prefer them when q-values tie. GET noise prefers
+# JPEG, so browsers only get WebP or AVIF when they rank them higher. Overlays of
+# photos and text are smaller as WebP or AVIF, so on POST a type the client names
+# beats one it only accepts through a wildcard, and WebP then AVIF come first
+# among them. A bare "*/*" still gets JPEG on both.
+offered_types = tuple(known_conversions)
+overlay_types = tuple(mime_type for mime_type in ("image/jpeg", "image/webp", "image/avif") if mime_type in known_conversions)
+overlay_offered_types = overlay_types + tuple(mime_type for mime_type in known_conversions if mime_type not in overlay_types)
+
+# Pillow plugin module for each format we read or write
+codec_plugins = {
+    "JPEG": "JpegImagePlugin",
+    "PNG":  "PngImagePlugin",
+    "GIF":  "GifImagePlugin",
+    "BMP":  "BmpImagePlugin",
+    "WEBP": "WebPImagePlugin",
+    "AVIF": "AvifImagePlugin",
+}
+
+# Encoder knobs, only the ones set are passed on so Pillow's defaults apply otherwise
+#
+# JPEG_QUALITY, WEBP_QUALITY, AVIF_QUALITY - 0 to 100
+# WEBP_METHOD  - effort from 0 (fast) to 6 (small)
+# AVIF_SPEED   - 0 (small) to 10 (fast)
+# PNG_COMPRESS_LEVEL - zlib level 0 to 9, disables parallel PNG encoding
+encode_variables = {
+    "JPEG": { "quality": "JPEG_QUALITY" },
+    "WEBP": { "quality": "WEBP_QUALITY", "method": "WEBP_METHOD" },
+    "AVIF": { "quality": "AVIF_QUALITY", "speed":  "AVIF_SPEED" },
+    "PNG":  { "compress_level": "PNG_COMPRESS_LEVEL" },
+}
+
+def get_encode_settings(environ):
+    # Pillow save options for each format from the variables that are set
+    settings = {}
+    for image_format, variables in encode_variables.items():
+        options = { option: int(environ[variable]) for option, variable in variables.items() if variable in environ }
+        if options:
+            settings[image_format] = options
+    return settings
+
+encode_settings = get_encode_settings(os.environ)
+
+def register_codecs():
+    # Only load the Pillow plugins for known_conversions. Marking Pillow as fully
+    # initialised stops it from importing every other plugin the first time an
+    # upload doesn't match, so uploads are limited to the same formats.
+    for format in set(known_conversions.values()):
+        import_module("PIL." + codec_plugins[format])
+    Image._initialized = 2
+
+# Decoded modes noise is not composited in directly and the mode they are
+# converted to. Palettes become L or RGB, see working_mode.
+working_modes = {
+    "1":     "L",
+    "I":     "L",
+    "I;16":  "L",
+    "F":     "L",
+    "PA":    "RGBA",
+    "CMYK":  "RGB",
+    "YCbCr": "RGB",
+    "LAB":   "RGB",
+    "HSV":   "RGB",
+}
+
+# Integer modes hold 16-bit samples when decoded from PNG, scaled to 8 bits
+# when converted instead of being clipped at 255
+working_scales = {
+    "I":    1 / 257,
+    "I;16": 1 / 257,
+}
+
+# Modes an encoder can not write and the cheapest mode to convert them to.
+# Everything else is written as it is, so greyscale stays single channel and
+# GIF writes L with a grey palette instead of quantizing RGB.
+output_modes = {
+    "JPEG": { "LA": "L", "RGBA": "RGB", "P": "RGB" },
+    "BMP":  { "LA": "RGBA" },
+}
+
+# OPTIONS responses only need a tiny image in the requested format
+options_image   = Image.new('RGB',(1,1))
+options_results = {}
+
+def prewarm():
+    # One-time work that is otherwise paid by the first request using it
+    text_render.get_atlas().warm(string.printable)
+    for mime_type in known_conversions:
+        encode_options(mime_type)
+
+def generate_noise_bytes(xdim=50,ydim=50,cmin=0,cmax=255,seed=None,offset=0):
+    # Generate data in bulk, see noise.py for the available engines
+    img_bytes = noise.noise_bytes(xdim*ydim,cmin,cmax,seed,offset)
     return img_bytes
 
-def generate_noise_img(xdim,ydim,cmin=0,cmax=255):
-    # Use PIL to create image
-    img_bytes = generate_noise_bytes(xdim,ydim,cmin,cmax)
-    image = Image.frombytes('L',(xdim,ydim), img_bytes, "raw", "L", 0, 1)
+@instrument.timed("noise")
+def generate_noise_img(xdim,ydim,cmin=0,cmax=255,seed=None,offset=0):
+    # Use PIL to create image, sharing the noise buffer instead of copying it.
+    # offset is the first pixel of a larger seeded image this one is part of.
+    img_bytes = generate_noise_bytes(xdim,ydim,cmin,cmax,seed,offset)
+    image = Image.frombuffer('L',(xdim,ydim), img_bytes, "raw", "L", 0, 1)
     return image
 
-def get_mime_type(accept_string):
-    # Accept string is a comma separated list of preferences. Find first one we can handle
-    for option in accept_string.split(","):
-        mime_type = option.split(";")[0]
-        if mime_type == "*/*":
-            mime_type = "image/jpeg"
-        if mime_type in known_conversions:
-            return mime_type
-    return "unknown/unknown"
-
-def encode_img(image,accept_string):
+def ranked_types(accept_string,overlay=False):
+    # Known conversions the Accept string allows, preferred first
+    if overlay:
+        return negotiate.ranked_matches(accept_string,overlay_offered_types,True)
+    return negotiate.ranked_matches(accept_string,offered_types)
+
+def get_mime_type(accept_string,overlay=False):
+    # Best known conversion for the Accept string by q-value, "*/*" gets JPEG
+    ranked = ranked_types(accept_string,overlay)
+    return ranked[0] if ranked else negotiate.UNKNOWN
+
+def output_image(image,format):
+    # Convert only when the encoder can not write the image's mode
+    mode = output_modes.get(format,{}).get(image.mode)
+    return image if mode is None else image.convert(mode)
+
+@instrument.timed("encode")
+def encode_img(image,accept_string,overlay=False):
     # Convert image data into an image file and base64 encode it
-    mime_type = get_mime_type(accept_string)
+    mime_type = get_mime_type(accept_string,overlay)
     if mime_type in known_conversions:
-        # Use BytesIO to write to a virtual file
-        img_buffer = BytesIO()
-        image.save(img_buffer,format=known_conversions[mime_type])
-        img_binary = img_buffer.getvalue()
-        img_buffer.close()
+        # Write to a virtual file and keep a view on it instead of copying it out
+        format     = known_conversions[mime_type]
+        img_binary = encoder.encode_view(output_image(image,format),format,**encode_settings.get(format,{}))
         return { "success": True,  "mimetype": mime_type,    "data": img_binary }
     else:
         return { "success": False, "mimetype": "text/plain", "data": "Unknown encoding requested" }
 
-def decode_img(img_data,mime_type,xdim,ydim):
+def is_greyscale_palette(image):
+    palette = image.getpalette() or []
+    return palette[0::3] == palette[1::3] == palette[2::3]
+
+def working_mode(image):
+    # Cheapest mode that noise can be composited in without losing colour or
+    # transparency. Grey palettes, common in GIFs, stay single channel.
+    if image.mode == 'P':
+        alpha = "transparency" in image.info
+        if is_greyscale_palette(image):
+            return "LA" if alpha else "L"
+        return "RGBA" if alpha else "RGB"
+    return working_modes.get(image.mode,image.mode)
+
+def convert_to_working_mode(image):
+    # Decoded image in its working mode, see working_modes
+    mode = working_mode(image)
+    if image.mode in working_scales:
+        scale = working_scales[image.mode]
+        image = image.convert("I").point(lambda value: value * scale)
+    return image if image.mode == mode else image.convert(mode)
+
+def fit_size(size,target):
+    # Fill in a missing target dimension from the aspect ratio of size
+    width, height = target
+    if width is None:
+        width = max(1, round(size[0] * height / size[1]))
+    if height is None:
+        height = max(1, round(size[1] * width / size[0]))
+    return width, height
+
+def encode_options(mime_type):
+    # The OPTIONS response for a mime type never changes, encode it once
+    if mime_type not in options_results:
+        options_results[mime_type] = encode_img(options_image,mime_type)
+    return options_results[mime_type]
+
+@instrument.timed("decode_img")
+def decode_img(img_data,mime_type,xdim,ydim,target=None):
     # If the content type claims we received an image/binary:
-    if re.match("image/",mime_type) or mime_type=='application/x-www-form-urlencoded':
+    if mime_type.startswith("image/") or mime_type=='application/x-www-form-urlencoded':
         # This function relies entirely on PIL to identify image type, no mime type checking
         img_buffer = BytesIO(img_data)
         img_buffer.seek(0)
         image = Image.open(img_buffer)
+        if target is not None:
+            target = fit_size(image.size,target)
+            # JPEG can decode at 1/2, 1/4 or 1/8 scale directly, draft picks the
+            # smallest scale that is still at least the target size
+            image.draft(image.mode,target)
     else:
-        # Render the plain text as black text on a white background
-        image = Image.new("RGB", (xdim,ydim), (255, 255, 255))
-        draw  = ImageDraw.Draw(image)
-        draw.multiline_text((0,0),img_data.decode('utf-8'),fill=(0,0,0))
-    if image.mode == 'P':
-        image = image.convert('RGB')
+        # Render the plain text as black text on a white background, xdim wide
+        # and at least ydim tall
+        image  = text_render.render(img_data.decode('utf-8'),xdim,ydim)
+        target = None
+    image = convert_to_working_mode(image)
+    if target is not None and image.size != target:
+        image = image.resize(target,Image.LANCZOS,reducing_gap=3.0)
     return image
 
-def overlay_noise_on_image(image,cmin=0,cmax=255):
+def overlay_noise_on_image(image,cmin=0,cmax=255,seed=None,band_rows=None):
     xdim_src, ydim_src = image.size
-    noise_image = generate_noise_img(xdim=xdim_src, ydim=ydim_src, cmin=cmin, cmax=cmax)
-    image.paste(noise_image,(0,0),noise_image)
+    if band_rows is None:
+        band_rows = overlay_band_rows
+    if band_rows <= 0:
+        band_rows = ydim_src
+    # Work in bands of rows so only one band of noise exists at a time. Seeded
+    # noise is addressed by pixel offset, so the result doesn't depend on band size.
+    for top in range(0, ydim_src, band_rows):
+        rows = min(band_rows, ydim_src - top)
+        with instrument.stage("noise"):
+            noise_buf = generate_noise_bytes(xdim_src, rows, cmin, cmax, seed, top*xdim_src)
+        with instrument.stage("composite"):
+            composite.overlay(image,top,noise_buf)
     return image
 
-def lambda_handler(event, context):
-    print(event)
+def planned_size(img_data,mime_type,xdim,ydim,target=None):
+    # (pixels, channels) decode_img will produce, from the image header only.
+    # None when the upload can't be read, decode_img reports that.
+    if mime_type.startswith("image/") or mime_type=='application/x-www-form-urlencoded':
+        try:
+            image = Image.open(BytesIO(img_data))
+        except OSError:
+            return None
+        width, height = fit_size(image.size,target) if target is not None else image.size
+        # Telling grey palettes apart needs the palette, plan for colour
+        mode = "RGB" if image.mode == 'P' else working_mode(image)
+        return width * height, Image.getmodebands(mode)
+    # Text grows with its length up to the height limit
+    return xdim * max(ydim,text_render.max_height), 1
+
+def admit_request(accept,verb,pixels,channels=1,upload_bytes=0,context=None):
+    # Returns a rejection response or None, and the accept string to encode
+    # with, which names a cheaper format when the preferred one doesn't fit
+    if not admission.enabled():
+        return None, accept
+    if pixels < 1:
+        return admission.rejection("Image dimensions must be at least 1",None,admission.limits(context),["pixels"]), accept
+    candidates = [(mime_type, known_conversions[mime_type]) for mime_type in ranked_types(accept,verb == "POST")]
+    if not candidates:
+        return None, accept
+    mime_type, estimated, limit, over = admission.admit(pixels,candidates,verb,upload_bytes,channels,context)
+    if mime_type is None:
+        instrument.put_metric("AdmissionRejected",1)
+        return admission.rejection("Request exceeds the function's limits",estimated,limit,over), accept
+    if mime_type != candidates[0][0]:
+        instrument.put_metric("AdmissionDowngraded",1)
+        accept = mime_type
+    return None, accept
 
+@instrument.timed("parse_query")
+def get_noise_params(event):
     # Define desired image dimentions from query string if provided
     xdim_requested = int(event.get("queryStringParameters",{}).get("w",  xdim))
     ydim_requested = int(event.get("queryStringParameters",{}).get("h",  ydim))
     cmin_requested = int(event.get("queryStringParameters",{}).get("min",cmin))
     cmax_requested = int(event.get("queryStringParameters",{}).get("max",cmax))
 
+    # Optional noise seed for reproducible images
+    seed_requested = event.get("queryStringParameters",{}).get("seed")
+    if seed_requested is not None:
+        seed_requested = int(seed_requested)
+
+    return xdim_requested, ydim_requested, cmin_requested, cmax_requested, seed_requested
+
+def get_target_size(event):
+    # Uploaded images keep their size unless w or h is given explicitly
+    query = event.get("queryStringParameters",{})
+    if "w" not in query and "h" not in query:
+        return None
+    return (
+        int(query["w"]) if "w" in query else None,
+        int(query["h"]) if "h" in query else None
+        )
+
+@instrument.timed("b64decode")
+def get_body_bytes(event):
+    # Base64 decode data it it came in encoded
+    img_string = event.get("body","")
+    if event.get("isBase64Encoded",False)==True:
+        return b64decode(img_string)
+    else:
+        return img_string.encode('utf-8')
+
+# Init phase: runs once per container before the first request
+register_codecs()
+noise.noise_table(cmin,cmax)
+if os.environ.get("PREWARM","0") == "1" or os.environ.get("AWS_LAMBDA_INITIALIZATION_TYPE") == "provisioned-concurrency":
+    prewarm()
+
+@instrument.handler("img_api")
+def lambda_handler(event, context):
+
+    xdim_requested, ydim_requested, cmin_requested, cmax_requested, seed_requested = get_noise_params(event)
+
     # For demo purposes only - define whether plain text response in base64 encoded
     demo64Flag   = int(event.get("queryStringParameters",{}).get("demo64Flag",0))
 
@@ -110,28 +354,56 @@ def lambda_handler(event, context):
     verb = event.get("requestContext",{}).get("http",{}).get("method","GET").split()[0]
     # On OPTIONS we don't return data so save time
     if verb == "OPTIONS":
-        image = Image.new('RGB',(1,1))
-        result = encode_img(image,accept)
+        result = encode_options(get_mime_type(accept))
     # On POST, take an image, overlay noise
     elif verb == "POST":
-        # Base64 decode data it it came in encoded
-        img_string = event.get("body","")
-        if event.get("isBase64Encoded",False)==True:
-            img_data = b64decode(img_string)
-        else:
-            img_data = img_string.encode('utf-8')
-        # Get a PIL image object from data and overlay noise
-        image = decode_img(
-            img_data, 
-            event.get("headers",{}).get("content-type","text/plain"),
-            xdim_requested,ydim_requested
-            )
-        image = overlay_noise_on_image(image,cmin_requested,cmax_requested)
-        result = encode_img(image,accept)
+        img_data     = get_body_bytes(event)
+        content_type = event.get("headers",{}).get("content-type","text/plain")
+        target_size  = get_target_size(event)
+        planned = planned_size(img_data,content_type,xdim_requested,ydim_requested,target_size)
+        if planned is not None:
+            rejected, accept = admit_request(accept,verb,*planned,len(img_data),context)
+            if rejected is not None:
+                return rejected
+        # Seeded results only depend on the upload and parameters, look for a finished one
+        cache_key = None
+        if seed_requested is not None and result_cache.enabled():
+            cache_key = result_cache.make_key(img_data,(
+                content_type, xdim_requested, ydim_requested, target_size,
+                cmin_requested, cmax_requested, seed_requested, noise.engine_default,
+                get_mime_type(accept,True), encode_settings
+                ))
+        result = result_cache.get(cache_key)
+        if result is None:
+            # Get a PIL image object from data and overlay noise
+            image = decode_img(
+                img_data,
+                content_type,
+                xdim_requested,ydim_requested,
+                target_size
+                )
+            image = overlay_noise_on_image(image,cmin_requested,cmax_requested,seed_requested)
+            result = encode_img(image,accept,True)
+            if cache_key is not None and result["success"]:
+                result["body"] = encoder.b64encode_view(result["data"])
+                result_cache.put(cache_key,result)
     # On GET, just return the noise
     elif verb == "GET":
-        image = generate_noise_img(xdim_requested,ydim_requested,cmin_requested,cmax_requested)
-        result = encode_img(image,accept)
+        rejected, accept = admit_request(accept,verb,xdim_requested*ydim_requested,1,0,context)
+        if rejected is not None:
+            return rejected
+        if tile_cache.enabled():
+            result = tile_cache.fetch(
+                (xdim_requested,ydim_requested,cmin_requested,cmax_requested,seed_requested),
+                get_mime_type(accept),
+                lambda: generate_noise_img(xdim_requested,ydim_requested,cmin_requested,cmax_requested,seed_requested),
+                encode_img
+                )
+            for name, value in tile_cache.stats().items():
+                instrument.put_metric("NoiseCache" + name.title().replace("_",""),value)
+        else:
+            image = generate_noise_img(xdim_requested,ydim_requested,cmin_requested,cmax_requested,seed_requested)
+            result = encode_img(image,accept)
     # On all other calls return error
     else:
         result = { "success": False, "mimetype": "text/plain", "data": "Unsupported HTTP method" }
@@ -143,10 +415,12 @@ def lambda_handler(event, context):
             # Return the mime type of the image
             'headers': {
                 'Content-Type': result["mimetype"],
-                'Access-Control-Allow-Origin': '*'
+                'Access-Control-Allow-Origin': '*',
+                # The format depends on Accept, caches must keep them apart
+                'Vary': 'Accept'
             },
-            # Return the image
-            'body': b64encode(result["data"]),
+            # Return the image, cached results are already encoded
+            'body': result["body"] if "body" in result else encoder.b64encode_view(result["data"]),
             # Tell API-GW that it's Base64 encoded. 
             'isBase64Encoded': True
         }       
@@ -157,7 +431,7 @@ def lambda_handler(event, context):
             return_encode = False
         # Return failure message as unencoded string to API-GW
         else:
-            return_string = b64encode(("Binary path: " + result["data"]).encode('utf-8'))
+            return_string = encoder.b64encode_view(("Binary path: " + result["data"]).encode('utf-8'))
             return_encode = True
 
         return {                
@@ -172,3 +446,55 @@ def lambda_handler(event, context):
             # Tell API-GW whether it's Base64 encoded. 
             'isBase64Encoded': return_encode
         }
+
+def stream_error(message):
+    return {
+        'statusCode': 400,
+        'headers': {
+            'Content-Type': 'text/plain'
+        },
+        'body': iter([("Stream path: " + message).encode('utf-8')])
+    }
+
+@instrument.handler("img_api_stream")
+def stream_handler(event, context):
+    # Alternative entry point for Lambda response streaming. Instead of a base64
+    # body the response carries a generator of raw bytes that yields encoder
+    # output as it is produced, so time to first byte doesn't depend on image
+    # size and the 6 MB buffered response limit doesn't apply. The generator
+    # needs a streaming capable runtime integration to be sent incrementally.
+
+    xdim_requested, ydim_requested, cmin_requested, cmax_requested, seed_requested = get_noise_params(event)
+    accept    = event.get("headers",{}).get("accept","image/jpeg")
+    verb      = event.get("requestContext",{}).get("http",{}).get("method","GET").split()[0]
+    mime_type = get_mime_type(accept,verb == "POST")
+    if mime_type not in known_conversions:
+        return stream_error("Unknown encoding requested")
+
+    if verb == "OPTIONS":
+        image = options_image
+    elif verb == "POST":
+        image = decode_img(
+            get_body_bytes(event),
+            event.get("headers",{}).get("content-type","text/plain"),
+            xdim_requested,ydim_requested,
+            get_target_size(event)
+            )
+        image = overlay_noise_on_image(image,cmin_requested,cmax_requested,seed_requested)
+    elif verb == "GET":
+        image = generate_noise_img(xdim_requested,ydim_requested,cmin_requested,cmax_requested,seed_requested)
+    else:
+        return stream_error("Unsupported HTTP method")
+
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': mime_type,
+            'Access-Control-Allow-Origin': '*',
+            'Vary': 'Accept'
+        },
+        # Raw image bytes, produced while the client is already receiving them
+        'body': encoder.iter_encoded(output_image(image,known_conversions[mime_type]),
+                                     known_conversions[mime_type],
+                                     **encode_settings.get(known_conversions[mime_type],{}))
+    }
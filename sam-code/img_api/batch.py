@@ -0,0 +1,219 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import uuid
+import zipfile
+from base64             import b64decode
+from concurrent.futures import ThreadPoolExecutor
+from email.parser       import BytesParser
+from email.policy       import HTTP
+from io                 import BytesIO
+
+import admission
+import app
+import encoder
+import instrument
+
+# Batch entry point for the noise function: many noise images or overlays in one
+# invocation. Items are processed on a thread pool, Pillow and zlib release the
+# GIL while encoding so this spreads across the vCPUs of larger Lambda sizes.
+#
+# JSON body:   {"items": [{"w": 100, "h": 50, "min": 0, "max": 255, "seed": 1,
+#                          "format": "image/png"},
+#                         {"image": "<base64>", "content-type": "image/jpeg", ...}]}
+# Multipart:   multipart/form-data with one uploaded image per part, min/max/seed/w/h
+#              and format (a mime type) from the query string.
+#
+# The response is a zip (default) or multipart/mixed if the accept header asks for
+# it. Items that fail are reported in manifest.json, or as text/plain parts, and
+# don't fail the batch. Every item is checked against the admission model before
+# it is generated, and items that no longer fit in Lambda's response size limit
+# once the items before them are included are reported as failed too.
+#
+# BATCH_WORKERS   - worker threads, defaults to the number of CPUs
+# BATCH_MAX_ITEMS - largest batch accepted
+
+batch_workers   = int(os.environ.get("BATCH_WORKERS",os.cpu_count() or 1))
+batch_max_items = int(os.environ.get("BATCH_MAX_ITEMS",500))
+
+# Bytes reserved per item for zip headers, the manifest entry or part headers,
+# and once for the rest of the response
+ITEM_OVERHEAD     = 256
+RESPONSE_OVERHEAD = 1024
+
+extensions = {
+    "JPEG": "jpg",
+    "PNG":  "png",
+    "GIF":  "gif",
+    "BMP":  "bmp",
+    "WEBP": "webp",
+    "AVIF": "avif",
+}
+
+def parse_items(event):
+    # Returns a list of item dicts in the JSON request format
+    content_type = event.get("headers",{}).get("content-type","application/json")
+    body = app.get_body_bytes(event)
+    if content_type.startswith("multipart/"):
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode('utf-8') + b"\r\n\r\n" + body
+            )
+        query = event.get("queryStringParameters",{})
+        items = []
+        for part in message.iter_parts():
+            item = dict(query)
+            item["content-type"] = part.get_content_type()
+            item["data"]         = part.get_payload(decode=True)
+            items.append(item)
+        return items
+    return json.loads(body)["items"]
+
+def admit_item(pixels,channels,mime_type,verb="GET",upload_bytes=0):
+    # Raises when the item alone does not fit in the function's memory or a response
+    if not admission.enabled() or mime_type not in app.known_conversions:
+        return
+    if pixels < 1:
+        raise ValueError("Image dimensions must be at least 1")
+    estimated = admission.estimate(pixels,app.known_conversions[mime_type],verb,upload_bytes,channels)
+    over = admission.exceeded(estimated,admission.limits())
+    if over:
+        raise ValueError(f"Item exceeds the function's limits: {', '.join(over)}")
+
+def process_item(item):
+    # Returns (mime type, encoded image), raises on anything that goes wrong
+    cmin_requested = int(item.get("min",app.cmin))
+    cmax_requested = int(item.get("max",app.cmax))
+    seed_requested = int(item["seed"]) if item.get("seed") is not None else None
+    overlay = "image" in item or "data" in item
+    mime_type = app.get_mime_type(item.get("format","image/jpeg"),overlay)
+    if overlay:
+        img_data = item["data"] if "data" in item else b64decode(item["image"])
+        target = None
+        if "w" in item or "h" in item:
+            target = (
+                int(item["w"]) if "w" in item else None,
+                int(item["h"]) if "h" in item else None
+                )
+        content_type = item.get("content-type","image/jpeg")
+        planned = app.planned_size(img_data,content_type,app.xdim,app.ydim,target)
+        if planned is not None:
+            admit_item(*planned,mime_type,"POST",len(img_data))
+        image = app.decode_img(img_data,content_type,app.xdim,app.ydim,target)
+        image = app.overlay_noise_on_image(image,cmin_requested,cmax_requested,seed_requested)
+    else:
+        xdim_requested = int(item.get("w",app.xdim))
+        ydim_requested = int(item.get("h",app.ydim))
+        admit_item(xdim_requested*ydim_requested,1,mime_type)
+        image = app.generate_noise_img(xdim_requested,ydim_requested,cmin_requested,cmax_requested,seed_requested)
+    result = app.encode_img(image,mime_type)
+    if not result["success"]:
+        raise ValueError(result["data"])
+    return mime_type, result["data"]
+
+def run_item(item):
+    try:
+        return process_item(item)
+    except Exception as e:
+        return e
+
+def limit_response(outcomes):
+    # Replace the items that would take the base64 response past Lambda's
+    # limit with errors, in order, so the batch is returned instead of failing
+    budget = (admission.MAX_RESPONSE_BYTES * 3) // 4 - RESPONSE_OVERHEAD - len(outcomes) * ITEM_OVERHEAD
+    total  = 0
+    limited = []
+    for outcome in outcomes:
+        if not isinstance(outcome,Exception):
+            size = len(outcome[1])
+            if total + size > budget:
+                outcome = ValueError("Response size limit reached, request this item in another batch")
+            else:
+                total += size
+        limited.append(outcome)
+    return limited
+
+def zip_response(outcomes):
+    zip_buffer = BytesIO()
+    manifest = []
+    # Images are already compressed, storing them is much faster than deflating
+    with zipfile.ZipFile(zip_buffer,"w",zipfile.ZIP_STORED) as archive:
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome,Exception):
+                manifest.append({ "index": index, "status": "error", "error": str(outcome) })
+                continue
+            mime_type, data = outcome
+            name = f"item-{index:04d}.{extensions[app.known_conversions[mime_type]]}"
+            archive.writestr(name,bytes(data))
+            manifest.append({ "index": index, "status": "ok", "file": name, "mimetype": mime_type })
+        archive.writestr("manifest.json",json.dumps(manifest))
+    return "application/zip", zip_buffer.getbuffer()
+
+def multipart_response(outcomes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome,Exception):
+            mime_type, status, data = "text/plain", "error", str(outcome).encode('utf-8')
+        else:
+            (mime_type, data), status = outcome, "ok"
+        parts.append(
+            f"--{boundary}\r\n"
+            f"Content-Type: {mime_type}\r\n"
+            f"X-Item-Index: {index}\r\n"
+            f"X-Item-Status: {status}\r\n\r\n".encode('utf-8')
+            )
+        parts.append(data)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode('utf-8'))
+    return f"multipart/mixed; boundary={boundary}", b"".join(parts)
+
+def error_response(status_code,message):
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'text/plain'
+        },
+        'body': "Batch path: " + message,
+        'isBase64Encoded': False
+    }
+
+@instrument.handler("img_api_batch")
+def lambda_handler(event, context):
+
+    try:
+        items = parse_items(event)
+    except (ValueError, KeyError, TypeError) as e:
+        return error_response(400,f"Could not read batch request: {e}")
+    if len(items) > batch_max_items:
+        return error_response(413,f"Too many items, at most {batch_max_items} per batch")
+
+    with ThreadPoolExecutor(max_workers=batch_workers) as pool:
+        outcomes = limit_response(list(pool.map(run_item,items)))
+
+    if "multipart/mixed" in event.get("headers",{}).get("accept",""):
+        content_type, data = multipart_response(outcomes)
+    else:
+        content_type, data = zip_response(outcomes)
+    return {
+        'statusCode': 200,
+        'headers': {
+            'Content-Type': content_type,
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': encoder.b64encode_view(data),
+        'isBase64Encoded': True
+    }
@@ -0,0 +1,214 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import struct
+import zlib
+from binascii  import b2a_base64
+from io        import BytesIO
+from queue     import Queue, Empty
+from threading import Lock, Thread
+
+import instrument
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Encoded images are handed around as memoryviews on the encoder's own buffer and
+# base64 encoded in chunks into one output buffer that is reused between
+# invocations, so a large image is never copied in full more than necessary.
+
+# Must be a multiple of 3 so the base64 chunks join without padding in between
+B64_CHUNK = 3 << 20
+
+# Number of encoder writes buffered ahead of a slow stream consumer
+STREAM_QUEUE_DEPTH = 16
+
+# Large PNGs are deflated in parallel row groups, like pigz does for gzip.
+# ENCODE_WORKERS threads, used for images of at least PARALLEL_ENCODE_MIN_PIXELS.
+encode_workers      = int(os.environ.get("ENCODE_WORKERS",os.cpu_count() or 1))
+parallel_min_pixels = int(os.environ.get("PARALLEL_ENCODE_MIN_PIXELS",4000000))
+
+# Uncompressed bytes per row group, and the deflate window primed from the previous group
+PNG_GROUP_BYTES = 1 << 20
+PNG_WINDOW      = 1 << 15
+
+png_color_types = { "L": 0, "RGB": 2, "LA": 4, "RGBA": 6 }
+
+# image.info entries Pillow's PNG encoder writes as chunks that the parallel
+# encoder doesn't, images carrying them are saved by Pillow
+png_metadata = ("icc_profile", "transparency", "gamma", "dpi")
+
+_b64_buffer = bytearray()
+_b64_lock   = Lock()
+
+def encode_view(image,format,**options):
+    # Save image into a virtual file and return a view on its buffer without copying
+    if (format == "PNG" and not options and encode_workers > 1
+            and image.mode in png_color_types
+            and image.width * image.height >= parallel_min_pixels
+            and not any(key in image.info for key in png_metadata)):
+        return memoryview(encode_png_parallel(image,encode_workers))
+    img_buffer = BytesIO()
+    image.save(img_buffer,format=format,**options)
+    return img_buffer.getbuffer()
+
+def adler32_combine(adler1,adler2,length2):
+    # Checksum of two concatenated blocks from their checksums, as in zlib
+    base = 65521
+    rem  = length2 % base
+    sum1 = adler1 & 0xffff
+    sum2 = (rem * sum1) % base
+    sum1 = (sum1 + (adler2 & 0xffff) + base - 1) % base
+    sum2 = (sum2 + (adler1 >> 16) + (adler2 >> 16) + base - rem) % base
+    return sum1 | (sum2 << 16)
+
+def _png_filtered_rows(raw,stride,first,last):
+    # PNG scanlines first..last-1, each prefixed with its filter type. Uses the
+    # Up filter when numpy is available, which only needs the row above.
+    rows = memoryview(raw)[first*stride:last*stride]
+    if numpy is None:
+        out = bytearray((stride+1) * (last-first))
+        for row in range(last-first):
+            out[row*(stride+1)+1:(row+1)*(stride+1)] = rows[row*stride:(row+1)*stride]
+        return out
+    out = numpy.empty((last-first, stride+1), dtype=numpy.uint8)
+    out[:,0] = 2
+    pixels = numpy.frombuffer(rows, dtype=numpy.uint8).reshape(last-first, stride)
+    if first == 0:
+        out[0,1:] = pixels[0]
+    else:
+        numpy.subtract(pixels[0], numpy.frombuffer(raw, dtype=numpy.uint8, count=stride, offset=(first-1)*stride), out=out[0,1:])
+    numpy.subtract(pixels[1:], pixels[:-1], out=out[1:,1:])
+    return out.data
+
+def _png_chunk(chunk_type,data):
+    return struct.pack(">I",len(data)) + chunk_type + data + struct.pack(">I",zlib.crc32(data,zlib.crc32(chunk_type)))
+
+def encode_png_parallel(image,workers):
+    # Deflate independent row groups on a thread pool, zlib releases the GIL while
+    # compressing. Every group but the last ends in a sync flush so the raw deflate
+    # streams can be concatenated, and starts with the previous group's last 32 KiB
+    # as dictionary so compression barely suffers from the split.
+    from concurrent.futures import ThreadPoolExecutor
+
+    raw    = image.tobytes()
+    stride = len(raw) // image.height
+    rows_per_group = max(1, PNG_GROUP_BYTES // stride)
+    groups = [(first, min(first + rows_per_group, image.height)) for first in range(0, image.height, rows_per_group)]
+    window_rows = -(-PNG_WINDOW // (stride+1))
+
+    def deflate(group):
+        first, last = group
+        data = _png_filtered_rows(raw,stride,first,last)
+        if first == 0:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        else:
+            window = _png_filtered_rows(raw,stride,max(0,first-window_rows),first)
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15, zdict=bytes(window[-PNG_WINDOW:]))
+        flush = zlib.Z_FINISH if last == image.height else zlib.Z_SYNC_FLUSH
+        return compressor.compress(data) + compressor.flush(flush), zlib.adler32(data), len(data)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        deflated = list(pool.map(deflate,groups))
+
+    adler = 1
+    for _, group_adler, length in deflated:
+        adler = adler32_combine(adler,group_adler,length)
+
+    png = bytearray(b"\x89PNG\r\n\x1a\n")
+    png += _png_chunk(b"IHDR", struct.pack(">IIBBBBB", image.width, image.height, 8, png_color_types[image.mode], 0, 0, 0))
+    # zlib header for a 32 KiB window at the default level, then the groups
+    png += _png_chunk(b"IDAT", b"\x78\x9c")
+    for compressed, _, _ in deflated:
+        png += _png_chunk(b"IDAT", compressed)
+    png += _png_chunk(b"IDAT", struct.pack(">I",adler))
+    png += _png_chunk(b"IEND", b"")
+    return png
+
+def _grow_b64_buffer(size):
+    global _b64_buffer
+    if len(_b64_buffer) < size:
+        # Drop the old buffer first so both aren't alive at the same time
+        _b64_buffer = None
+        _b64_buffer = bytearray(size)
+    return _b64_buffer
+
+@instrument.timed("b64encode")
+def b64encode_view(data):
+    # Base64 encode any bytes-like object and return the result as str
+    view = memoryview(data).cast('B')
+    size = 4 * ((len(view) + 2) // 3)
+    with _b64_lock, memoryview(_grow_b64_buffer(size)) as out:
+        pos = 0
+        for start in range(0, len(view), B64_CHUNK):
+            chunk = b2a_base64(view[start:start + B64_CHUNK], newline=False)
+            out[pos:pos + len(chunk)] = chunk
+            pos += len(chunk)
+        return str(out[:size], 'ascii')
+
+class _QueueWriter:
+    # Minimal file object for Image.save that hands every write to a queue
+    def __init__(self,chunks):
+        self.chunks = chunks
+        self.closed = False
+        self.pos    = 0
+
+    def write(self,data):
+        if self.closed:
+            raise BrokenPipeError("Stream consumer went away")
+        self.chunks.put(bytes(data))
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+def iter_encoded(image,format,**options):
+    # Generator yielding the encoded image in the pieces the encoder writes them.
+    # The encoder runs in a thread and blocks once STREAM_QUEUE_DEPTH pieces are
+    # waiting, so memory stays bounded if the consumer is slower than the encoder.
+    chunks = Queue(STREAM_QUEUE_DEPTH)
+    writer = _QueueWriter(chunks)
+    errors = []
+
+    def run():
+        try:
+            image.save(writer,format=format,**options)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            chunks.put(None)
+
+    thread = Thread(target=run,daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        if errors:
+            raise errors[0]
+    finally:
+        # Unblock and stop the encoder if the consumer stopped early
+        writer.closed = True
+        while thread.is_alive():
+            try:
+                chunks.get(timeout=0.01)
+            except Empty:
+                pass
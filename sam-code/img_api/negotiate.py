@@ -0,0 +1,86 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from functools import lru_cache
+
+# Accept header negotiation. Each offered type gets the q-value of the most
+# specific media range matching it. Types are ranked by that q-value and ties
+# go to the order they are offered in, not the order of the header, so
+# "image/avif,image/webp,*/*" still gets the first offered type. With
+# explicit_first, types the header names outrank those only matched by a
+# wildcard at the same q-value. Clients send a handful of distinct Accept
+# strings, so parsed headers and their outcome are memoized.
+
+UNKNOWN = "unknown/unknown"
+
+def parse_q(params):
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return min(max(float(value),0.0),1.0)
+            except ValueError:
+                return 1.0
+    return 1.0
+
+@lru_cache(maxsize=1024)
+def parse_accept(accept_string):
+    # Tuple of (media_range, q) in header order
+    ranges = []
+    for option in accept_string.split(","):
+        media_range, *params = option.split(";")
+        media_range = media_range.strip().lower()
+        if media_range:
+            ranges.append((media_range, parse_q(params)))
+    return tuple(ranges)
+
+def specificity(media_range,mime_type):
+    # 2 for an exact match, 1 for type/*, 0 for */*, None if it doesn't match
+    if media_range == mime_type:
+        return 2
+    if media_range == "*/*" or media_range == "*":
+        return 0
+    if media_range.endswith("/*") and mime_type.startswith(media_range[:-1]):
+        return 1
+    return None
+
+def quality(mime_type,ranges):
+    # (q, specificity) of the most specific range matching mime_type, the first
+    # one on ties, None if no range matches
+    best = None
+    for media_range, q in ranges:
+        level = specificity(media_range,mime_type)
+        if level is not None and (best is None or level > best[1]):
+            best = (q, level)
+    return best
+
+@lru_cache(maxsize=1024)
+def ranked_matches(accept_string,offered,explicit_first=False):
+    # The offered mime types the client accepts, most preferred first. offered
+    # is a tuple of mime types with the one the server prefers first.
+    ranges = parse_accept(accept_string)
+    ranked = []
+    for index, mime_type in enumerate(offered):
+        matched = quality(mime_type,ranges)
+        # q=0 excludes a type
+        if matched is not None and matched[0] > 0:
+            explicit = matched[1] == 2 if explicit_first else False
+            ranked.append((-matched[0], not explicit, index, mime_type))
+    return tuple(mime_type for *_, mime_type in sorted(ranked))
+
+def best_match(accept_string,offered,explicit_first=False):
+    # The offered mime type the client prefers
+    ranked = ranked_matches(accept_string,offered,explicit_first)
+    return ranked[0] if ranked else UNKNOWN
@@ -0,0 +1,93 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+from functools import lru_cache
+from hashlib   import blake2b
+from random    import Random, random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Noise engines fill a preallocated buffer with pixel values in the same range as
+# int((cmax-cmin)*random())+cmin. Select one with NOISE_ENGINE, default is numpy if
+# it is installed and os.urandom otherwise. Seeded output is reproducible for a given
+# engine and seed, and is addressable by pixel offset so images can be built in parts.
+engine_default = os.environ.get("NOISE_ENGINE", "numpy" if numpy is not None else "urandom")
+
+# Seeds are reduced to 128 bits, numpy's PCG64 rejects negative seeds and this
+# keeps every engine accepting the same seeds
+seed_mask = (1 << 128) - 1
+
+@lru_cache(maxsize=64)
+def noise_table(cmin=0,cmax=255):
+    # Map a uniformly distributed random byte onto the requested value range.
+    # Truncates towards cmin like the original int() conversion.
+    delta = cmax-cmin
+    sign  = -1 if delta < 0 else 1
+    table = [cmin + sign*((abs(delta)*b) >> 8) for b in range(256)]
+    if min(table) < 0 or max(table) > 255:
+        raise ValueError("bytes must be in range(0, 256)")
+    return bytes(table)
+
+def _fill_python(buf,table,cmin,cmax,seed,offset):
+    # Original per-pixel implementation, kept as reference for benchmarks
+    rand = random if seed is None else Random(seed).random
+    for _ in range(offset):
+        rand()
+    buf[:] = bytes([int((cmax-cmin)*rand())+cmin for x in range(len(buf))])
+
+def _fill_urandom(buf,table,cmin,cmax,seed,offset):
+    if seed is None:
+        raw = os.urandom(len(buf))
+    else:
+        # blake2b in counter mode, 64 bytes per block
+        first = offset // 64
+        last  = (offset + len(buf) + 63) // 64
+        key   = str(seed).encode('utf-8')[:64]
+        raw   = b"".join(
+            blake2b(block.to_bytes(8,'little'), key=key).digest()
+            for block in range(first,last)
+            )[offset % 64:offset % 64 + len(buf)]
+    buf[:] = raw.translate(table)
+
+def _fill_numpy(buf,table,cmin,cmax,seed,offset):
+    out = numpy.frombuffer(buf, dtype=numpy.uint8)
+    # PCG64 can jump ahead cheaply, so seeded noise starts at the right word
+    bit_generator = numpy.random.PCG64(seed)
+    bit_generator.advance(offset // 8)
+    words = (offset % 8 + len(out) + 7) // 8
+    raw = bit_generator.random_raw(words).view(numpy.uint8)[offset % 8:offset % 8 + len(out)]
+    numpy.take(numpy.frombuffer(table, dtype=numpy.uint8), raw, out=out)
+
+engines = {
+    "python":  _fill_python,
+    "urandom": _fill_urandom,
+}
+if numpy is not None:
+    engines["numpy"] = _fill_numpy
+
+def fill_noise(buf,cmin=0,cmax=255,seed=None,offset=0,engine=None):
+    # Fill a writable buffer (bytearray or memoryview) with noise in place
+    table = noise_table(cmin,cmax)
+    if seed is not None:
+        seed &= seed_mask
+    engines[engine or engine_default](memoryview(buf).cast('B'),table,cmin,cmax,seed,offset)
+    return buf
+
+def noise_bytes(size,cmin=0,cmax=255,seed=None,offset=0,engine=None):
+    return fill_noise(bytearray(size),cmin,cmax,seed,offset,engine)
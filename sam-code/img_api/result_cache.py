@@ -0,0 +1,176 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+from hashlib import sha256
+
+import instrument
+
+# Content addressed cache for finished POST responses. Only used for seeded
+# requests, where the same upload and parameters always give the same image.
+# Lookups go to a local disk tier in /tmp first and then to an optional remote tier.
+#
+# RESULT_CACHE_DIR        - directory of the disk tier
+# RESULT_CACHE_DISK_BYTES - size bound of the disk tier, 0 disables it (default)
+# RESULT_CACHE_BUCKET     - S3 bucket used as remote tier, unset disables it. The
+#                           function needs s3:GetObject and s3:PutObject on
+#                           noise-cache/* and s3:ListBucket on the bucket, see the
+#                           ResultCacheBucket parameter in template.yaml
+#
+# The cache never fails a request: remote errors count as misses on get and are
+# logged and skipped on put.
+
+# Bump when a code change alters the output for the same parameters
+CACHE_VERSION = "2"
+
+class MemoryTier:
+    # Remote tier stand-in keeping everything in a dict
+    def __init__(self):
+        self.entries = {}
+
+    def get(self,key):
+        return self.entries.get(key)
+
+    def put(self,key,value):
+        self.entries[key] = value
+
+class DirectoryTier:
+    # One file per entry. With max_bytes set the least recently used files are
+    # removed once the directory grows beyond it.
+    def __init__(self,path,max_bytes=None):
+        self.path      = path
+        self.max_bytes = max_bytes
+        self.size      = None
+
+    def _file(self,key):
+        return os.path.join(self.path,key)
+
+    def get(self,key):
+        try:
+            with open(self._file(key),"rb") as fh:
+                value = fh.read()
+        except FileNotFoundError:
+            return None
+        # mtime is the recency used for eviction
+        os.utime(self._file(key))
+        return value
+
+    def put(self,key,value):
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+        os.makedirs(self.path,exist_ok=True)
+        if self.size is None:
+            self.size = sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+        temp_file = self._file(key) + ".tmp"
+        with open(temp_file,"wb") as fh:
+            fh.write(value)
+        os.replace(temp_file,self._file(key))
+        self.size += len(value)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.path) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime
+            )
+        self.size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self.size <= self.max_bytes:
+                break
+            self.size -= entry.stat().st_size
+            os.remove(entry.path)
+
+class S3Tier:
+    def __init__(self,bucket,prefix="noise-cache/"):
+        # boto3 is part of the Lambda runtime but only needed when configured
+        import boto3
+        from botocore.exceptions import BotoCoreError, ClientError
+        self.client = boto3.client("s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        # Missing keys, missing permissions, throttling and timeouts
+        self.errors = (BotoCoreError, ClientError)
+
+    def failed(self,operation,error):
+        print(f"Result cache: S3 {operation} of s3://{self.bucket}/{self.prefix} failed: {error}")
+        instrument.put_metric("ResultCacheErrors",1)
+
+    def get(self,key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket,Key=self.prefix + key)
+            return response["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+        except self.errors as e:
+            # Without s3:ListBucket S3 answers a missing key with AccessDenied
+            self.failed("get",e)
+            return None
+
+    def put(self,key,value):
+        try:
+            self.client.put_object(Bucket=self.bucket,Key=self.prefix + key,Body=value)
+        except self.errors as e:
+            self.failed("put",e)
+
+disk = None
+if int(os.environ.get("RESULT_CACHE_DISK_BYTES",0)) > 0:
+    disk = DirectoryTier(
+        os.environ.get("RESULT_CACHE_DIR","/tmp/result-cache"),
+        int(os.environ["RESULT_CACHE_DISK_BYTES"])
+        )
+
+remote = None
+if os.environ.get("RESULT_CACHE_BUCKET"):
+    remote = S3Tier(os.environ["RESULT_CACHE_BUCKET"])
+
+def enabled():
+    return disk is not None or remote is not None
+
+def make_key(img_data,params):
+    # params is anything with a stable repr that, with the upload, defines the output
+    digest = sha256(img_data)
+    digest.update(repr((CACHE_VERSION,) + tuple(params)).encode('utf-8'))
+    return digest.hexdigest()
+
+def pack(result):
+    return result["mimetype"].encode('ascii') + b"\n" + result["body"].encode('ascii')
+
+def unpack(value):
+    mimetype, body = value.split(b"\n",1)
+    return { "success": True, "mimetype": mimetype.decode('ascii'), "body": body.decode('ascii') }
+
+def get(key):
+    # Returns a result dict with the base64 encoded body or None
+    if key is None:
+        return None
+    for tier in (disk, remote):
+        if tier is None:
+            continue
+        value = tier.get(key)
+        if value is not None:
+            if tier is remote and disk is not None:
+                disk.put(key,value)
+            return unpack(value)
+    return None
+
+def put(key,result):
+    # result needs "body", the base64 encoded response body
+    if key is None or not result["success"]:
+        return
+    value = pack(result)
+    for tier in (disk, remote):
+        if tier is not None:
+            tier.put(key,value)
@@ -0,0 +1,132 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+from itertools import islice
+from math      import ceil
+
+from PIL import Image
+
+import instrument
+
+# Plain text to image for the POST text path. Every glyph is rasterized once
+# into a warm container atlas and then blitted, lines are wrapped to the image
+# width and the canvas grows with the text instead of cropping it. The canvas is
+# filled one line strip at a time and lines past the height limit are never
+# laid out, so very long documents cost no more than the rows that are shown.
+#
+# ImageDraw and ImageFont are imported on first use to keep them out of cold
+# starts that never see text.
+#
+# TEXT_MAX_HEIGHT  - tallest canvas in pixels, longer documents are cut
+# TEXT_MAX_GLYPHS  - distinct glyphs kept in the atlas
+
+max_height = int(os.environ.get("TEXT_MAX_HEIGHT",4096))
+max_glyphs = int(os.environ.get("TEXT_MAX_GLYPHS",4096))
+
+# Pixels between lines, same as ImageDraw.multiline_text
+LINE_SPACING = 4
+
+class GlyphAtlas:
+    def __init__(self,font):
+        self.font   = font
+        self.glyphs = {}
+        # Line pitch as multiline_text computes it, tall enough for descenders
+        self.line_height = max(font.getbbox("A")[3] + LINE_SPACING, font.getbbox("Ag")[3])
+
+    def glyph(self,char):
+        # (mask, advance) of a character, mask is None for blank glyphs
+        entry = self.glyphs.get(char)
+        if entry is None:
+            advance = self.font.getlength(char)
+            right   = self.font.getbbox(char)[2]
+            mask    = None
+            if right > 0 and not char.isspace():
+                from PIL import ImageDraw
+                mask = Image.new('L',(int(ceil(right)),self.line_height),0)
+                ImageDraw.Draw(mask).text((0,0),char,fill=255,font=self.font)
+                if mask.getbbox() is None:
+                    mask = None
+            entry = (mask, advance)
+            if len(self.glyphs) < max_glyphs:
+                self.glyphs[char] = entry
+        return entry
+
+    def width(self,text):
+        return sum(self.glyph(char)[1] for char in text)
+
+    def warm(self,chars):
+        for char in chars:
+            self.glyph(char)
+
+# Atlas of the default font, built on first use unless prewarmed
+default_atlas = None
+
+def get_atlas():
+    global default_atlas
+    if default_atlas is None:
+        from PIL import ImageFont
+        default_atlas = GlyphAtlas(ImageFont.load_default())
+    return default_atlas
+
+def wrap(text,width,atlas):
+    # Yield lines no wider than width, breaking at spaces where possible and
+    # inside words that do not fit on a line of their own
+    for paragraph in text.expandtabs().splitlines():
+        line, line_width = "", 0
+        for word in paragraph.split(" "):
+            word_width  = atlas.width(word)
+            space_width = atlas.glyph(" ")[1] if line else 0
+            if line and line_width + space_width + word_width > width:
+                yield line
+                line, line_width, space_width = "", 0, 0
+            if word_width > width:
+                for char in word:
+                    advance = atlas.glyph(char)[1]
+                    if line and line_width + space_width + advance > width:
+                        yield line
+                        line, line_width, space_width = "", 0, 0
+                    line += (" " if space_width else "") + char
+                    line_width += space_width + advance
+                    space_width = 0
+                continue
+            line += (" " if space_width else "") + word
+            line_width += space_width + word_width
+        yield line
+
+def render_line(line,width,atlas):
+    # White text on black as one strip, used as a mask on the canvas
+    strip = Image.new('L',(width,atlas.line_height),0)
+    x = 0.0
+    for char in line:
+        mask, advance = atlas.glyph(char)
+        if mask is not None:
+            strip.paste(mask,(int(round(x)),0),mask)
+        x += advance
+    return strip
+
+@instrument.timed("render_text")
+def render(text,width,min_height,atlas=None):
+    # Black text on a white background, width pixels wide and as tall as the
+    # text needs, at least min_height and at most max_height
+    if atlas is None:
+        atlas = get_atlas()
+    lines  = list(islice(wrap(text,width,atlas),max(max_height // atlas.line_height,1)))
+    height = min(max(min_height,len(lines) * atlas.line_height),max(max_height,min_height))
+    image  = Image.new('L',(width,height),255)
+    for row, line in enumerate(lines):
+        if line.strip():
+            image.paste(0,(0,row * atlas.line_height),render_line(line,width,atlas))
+    return image
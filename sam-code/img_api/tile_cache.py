@@ -0,0 +1,112 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+from collections import OrderedDict
+
+# Warm container cache for GET noise. Keeps a small pool of generated tiles per
+# (w,h,min,max,seed) and the encoded payloads for each tile and mime type.
+# Entries are evicted least recently used first once the byte budget is exceeded.
+# Hits and misses are counted separately for pools and payloads.
+#
+# NOISE_CACHE_BYTES - byte budget, 0 disables the cache (default)
+# NOISE_POOL_SIZE   - number of distinct tiles kept per key, responses rotate through them
+
+class ByteLRU:
+    def __init__(self,max_bytes):
+        self.max_bytes = max_bytes
+        self.entries   = OrderedDict()
+        self.size      = 0
+        self.lookups   = {}
+        self.evictions = 0
+
+    def get(self,key,kind="entry"):
+        # kind names the hit and miss counters the lookup is counted in
+        counts = self.lookups.setdefault(kind,[0,0])
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            counts[0] += 1
+            return self.entries[key][0]
+        counts[1] += 1
+        return None
+
+    def put(self,key,value,nbytes):
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+        # Never keep something that doesn't fit on its own
+        if nbytes > self.max_bytes:
+            return
+        self.entries[key] = (value,nbytes)
+        self.size += nbytes
+        while self.size > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.size -= evicted_bytes
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self):
+        stats = {}
+        for kind, (hits, misses) in self.lookups.items():
+            stats[kind + "_hits"]   = hits
+            stats[kind + "_misses"] = misses
+        stats.update({
+            "evictions": self.evictions,
+            "entries":   len(self.entries),
+            "bytes":     self.size,
+            "max_bytes": self.max_bytes,
+        })
+        return stats
+
+cache     = ByteLRU(int(os.environ.get("NOISE_CACHE_BYTES",0)))
+pool_size = int(os.environ.get("NOISE_POOL_SIZE",4))
+
+def enabled():
+    return cache.max_bytes > 0
+
+def image_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+def next_tile(tile_key,generate):
+    # Seeded noise is deterministic so there is no point in keeping more than one tile
+    slots = 1 if tile_key[-1] is not None else pool_size
+    pool  = cache.get(("pool",) + tile_key, "pool")
+    if pool is None:
+        pool = { "tiles": [], "next": 0 }
+    index = pool["next"] % slots
+    pool["next"] = index + 1
+    if index == len(pool["tiles"]):
+        pool["tiles"].append(generate())
+    cache.put(("pool",) + tile_key, pool, sum(image_bytes(tile) for tile in pool["tiles"]))
+    return index, pool["tiles"][index]
+
+def fetch(tile_key,mime_type,generate,encode):
+    # tile_key is (w,h,min,max,seed). mime_type is the negotiated output type, so
+    # Accept strings that negotiate the same type share a payload. generate()
+    # returns a new noise image and encode(image,mime_type) returns the same
+    # result dict as app.encode_img
+    index, tile = next_tile(tile_key,generate)
+    payload_key = ("payload",) + tile_key + (index, mime_type)
+    result = cache.get(payload_key, "payload")
+    if result is None:
+        result = encode(tile,mime_type)
+        if result["success"]:
+            cache.put(payload_key, result, len(result["data"]))
+    return result
+
+def stats():
+    return cache.stats()
@@ -0,0 +1,204 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import random
+import resource
+import time
+from contextlib import contextmanager
+from functools  import wraps
+from hashlib    import sha256
+from threading  import Lock
+
+# Request level timing shared by all functions through a Lambda layer. Each
+# invocation logs one compact line in CloudWatch Embedded Metric Format with
+# the time spent per stage, bytes in and out and peak memory. Bodies are never
+# logged, only their size and a short hash.
+#
+# The kernel only keeps the peak RSS of the whole process, so memory is logged
+# as ContainerPeakRSS, the container's peak so far including earlier
+# invocations, and PeakRSSGrowth, how far this invocation raised that peak. A
+# request that needs more memory than any before it shows up in PeakRSSGrowth,
+# one that fits in memory already used shows 0. Use PROFILE=tracemalloc for the
+# Python allocations of single invocations.
+#
+# METRICS_NAMESPACE   - CloudWatch namespace of the metrics
+# PROFILE             - "cprofile" or "tracemalloc" to profile invocations
+# PROFILE_SAMPLE_RATE - fraction of invocations profiled when PROFILE is set
+
+namespace   = os.environ.get("METRICS_NAMESPACE","HttpApiBinaryData")
+profile     = os.environ.get("PROFILE","")
+sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE",1.0))
+
+# Stage timings of the invocation in progress. Lambda runs one invocation per
+# container at a time, but stages can be timed from worker threads.
+_current = None
+_lock    = Lock()
+
+# Characters of a str body encoded at a time while hashing it
+SUMMARY_CHUNK = 1 << 20
+
+def body_summary(body):
+    if body is None:
+        return None
+    if not isinstance(body,str):
+        return { "length": len(body), "sha256": sha256(body).hexdigest()[:16] }
+    # Encode in chunks, large bodies are not copied whole just to be hashed
+    digest, length = sha256(), 0
+    for start in range(0,len(body),SUMMARY_CHUNK):
+        chunk = body[start:start + SUMMARY_CHUNK].encode('utf-8')
+        digest.update(chunk)
+        length += len(chunk)
+    return { "length": length, "sha256": digest.hexdigest()[:16] }
+
+def event_summary(event):
+    # The event as it would have been printed, with the body replaced by a summary
+    summary = { key: value for key, value in event.items() if key != "body" }
+    if "body" in event:
+        summary["body"] = body_summary(event["body"])
+    return summary
+
+@contextmanager
+def stage(name):
+    # Time a block of work, repeated stages add up
+    if _current is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        with _lock:
+            if _current is not None:
+                _current["stages"][name] = _current["stages"].get(name,0) + elapsed
+
+def put_metric(name,value,unit="Count"):
+    # Record an extra metric for the invocation in progress
+    with _lock:
+        if _current is not None:
+            _current["metrics"][name] = (value,unit)
+
+def emit(function_name,verb,status_code,duration,stages,metrics,request_id):
+    values = { name: round(elapsed,3) for name, elapsed in stages.items() }
+    values.update({ name: value for name, (value, unit) in metrics.items() })
+    units  = { name: "Milliseconds" for name in stages }
+    units.update({ name: unit for name, (value, unit) in metrics.items() })
+    line = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace":  namespace,
+                "Dimensions": [["Function","Verb"]],
+                "Metrics":    [{ "Name": name, "Unit": unit } for name, unit in units.items()]
+            }]
+        },
+        "Function":   function_name,
+        "Verb":       verb,
+        "StatusCode": status_code,
+        "RequestId":  request_id,
+        "Duration":   round(duration,3),
+    }
+    line["_aws"]["CloudWatchMetrics"][0]["Metrics"].append({ "Name": "Duration", "Unit": "Milliseconds" })
+    line.update(values)
+    print(json.dumps(line,separators=(',',':')))
+
+@contextmanager
+def profiled(function_name):
+    # Opt-in profiling of a sample of invocations, results are logged as one line
+    if not profile or random.random() >= sample_rate:
+        yield
+        return
+    if profile == "cprofile":
+        import cProfile, io, pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            report = io.StringIO()
+            pstats.Stats(profiler,stream=report).sort_stats("cumulative").print_stats(20)
+            print(json.dumps({ "Function": function_name, "cprofile": report.getvalue() }))
+    elif profile == "tracemalloc":
+        import tracemalloc
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            tracemalloc.stop()
+            print(json.dumps({
+                "Function": function_name,
+                "tracemalloc": { "peak": peak, "current": current, "top": [str(stat) for stat in top] }
+            }))
+    else:
+        yield
+
+def peak_rss():
+    # Highest RSS of the process since it started, ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def handler(function_name):
+    # Decorator for Lambda handlers
+    def decorate(lambda_handler):
+        @wraps(lambda_handler)
+        def wrapped(event, context):
+            global _current
+            print(json.dumps(event_summary(event),separators=(',',':')))
+            verb = event.get("requestContext",{}).get("http",{}).get("method","GET")
+            body = event.get("body")
+            record = { "stages": {}, "metrics": {} }
+            with _lock:
+                _current = record
+            put_metric("BytesIn",len(body) if body is not None else 0,"Bytes")
+            peak_before = peak_rss()
+            start = time.perf_counter()
+            response = None
+            try:
+                with profiled(function_name):
+                    response = lambda_handler(event, context)
+                return response
+            finally:
+                duration = (time.perf_counter() - start) * 1000
+                # Local emulators can overlap invocations in one process, only
+                # the latest one is timed then but none of them may fail
+                with _lock:
+                    if _current is record:
+                        _current = None
+                status_code = None
+                if isinstance(response,dict):
+                    status_code = response.get("statusCode")
+                    if isinstance(response.get("body"),(str,bytes)):
+                        record["metrics"]["BytesOut"] = (len(response["body"]),"Bytes")
+                peak_after = peak_rss()
+                record["metrics"]["ContainerPeakRSS"] = (peak_after,"Bytes")
+                record["metrics"]["PeakRSSGrowth"]    = (peak_after - peak_before,"Bytes")
+                emit(function_name,verb,status_code,duration,record["stages"],record["metrics"],
+                     getattr(context,"aws_request_id",None))
+        return wrapped
+    return decorate
+
+def timed(name):
+    # Decorator timing every call of a function as a stage
+    def decorate(function):
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapped
+    return decorate
@@ -0,0 +1,209 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http               import HTTPStatus
+from urllib.parse       import urlsplit
+
+from local_api import gateway
+
+# asyncio based API Gateway HTTP API emulator. Connections are handled on the
+# event loop with HTTP/1.1 keep-alive, handlers run on a pool of worker threads
+# or processes, so contention and concurrency scaling can be measured on one
+# machine. Routes, layers and CORS settings come from template.yaml.
+#
+#   python -m local_api.emulator [--port 3000] [--workers 4] [--processes]
+#
+# GET /_emulator/stats returns request counts and the highest concurrency seen.
+
+# API Gateway rejects larger request payloads
+MAX_BODY = 10 * 1024 * 1024
+
+# Framing headers are set by the emulator, not copied from handler responses
+HOP_HEADERS = { "connection", "content-length", "keep-alive", "transfer-encoding" }
+
+class BadRequest(Exception):
+    def __init__(self,status,message):
+        super().__init__(message)
+        self.status = status
+
+# Handlers imported by each worker process, keyed by (module, function)
+_worker_routes = {}
+
+def run_route(module,function,code_dirs,event):
+    # Module level so process pool workers can run it
+    route = _worker_routes.get((module,function))
+    if route is None:
+        route = _worker_routes[(module,function)] = gateway.Route(None,None,module,function,code_dirs)
+    return gateway.invoke(route,event)
+
+async def read_chunked(reader,max_body):
+    body = bytearray()
+    while True:
+        size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            # Skip trailers up to the empty line
+            while (await reader.readline()).strip():
+                pass
+            return bytes(body)
+        if len(body) + size > max_body:
+            raise BadRequest(413,"Request Entity Too Large")
+        body += await reader.readexactly(size)
+        await reader.readline()
+
+async def read_request(reader,writer,max_body):
+    # Returns (method, target, version, headers, body) or None once the client is done
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode('latin-1').split()
+    except ValueError:
+        raise BadRequest(400,"Bad Request")
+    headers = []
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode('latin-1').partition(":")
+        headers.append((name.strip(), value.strip()))
+    lookup = { name.lower(): value for name, value in headers }
+    if lookup.get("expect","").lower() == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        await writer.drain()
+    if lookup.get("transfer-encoding","").lower() == "chunked":
+        body = await read_chunked(reader,max_body)
+    else:
+        length = int(lookup.get("content-length",0) or 0)
+        if length > max_body:
+            raise BadRequest(413,"Request Entity Too Large")
+        body = await reader.readexactly(length)
+    return method.upper(), target, version, headers, body
+
+def keep_alive(version,headers):
+    connection = { name.lower(): value for name, value in headers }.get("connection","").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+def write_response(writer,status,headers,body,alive,head=False):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers if name.lower() not in HOP_HEADERS]
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: " + ("keep-alive" if alive else "close"))
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+    if not head:
+        writer.write(body)
+
+class Emulator:
+    def __init__(self,routes=None,workers=4,processes=False,max_body=MAX_BODY):
+        self.routes    = routes if routes is not None else gateway.load_routes()
+        self.workers   = workers
+        self.executor  = ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers)
+        self.max_body  = max_body
+        self.requests  = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.handler_seconds = 0.0
+
+    def stats(self):
+        return {
+            "workers":         self.workers,
+            "requests":        self.requests,
+            "in_flight":       self.in_flight,
+            "max_in_flight":   self.max_in_flight,
+            "handler_seconds": round(self.handler_seconds,3),
+        }
+
+    async def respond(self,method,target,headers,body):
+        path  = gateway.strip_stage(urlsplit(target).path)
+        if path == "/_emulator/stats":
+            return 200, [("Content-Type","application/json")], json.dumps(self.stats()).encode('utf-8')
+        route = gateway.find_route(self.routes,method,path)
+        request_headers = { name.lower(): value for name, value in headers }
+        if route is None:
+            return 404, [("Content-Type","application/json")], b'{"message":"Not Found"}'
+        if gateway.is_preflight(route,method,request_headers):
+            return 204, gateway.cors_headers(route.cors,request_headers), b""
+        event = gateway.build_event(method,target,headers,body,route.path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight,self.in_flight)
+        start = time.perf_counter()
+        try:
+            status, response_headers, response_body = await asyncio.get_running_loop().run_in_executor(
+                self.executor, run_route, route.module, route.function, route.code_dirs, event)
+        finally:
+            self.in_flight -= 1
+            self.requests  += 1
+            self.handler_seconds += time.perf_counter() - start
+        return status, gateway.add_cors(response_headers,gateway.cors_headers(route.cors,request_headers)), response_body
+
+    async def handle_connection(self,reader,writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader,writer,self.max_body)
+                except BadRequest as e:
+                    write_response(writer,e.status,[("Content-Type","application/json")],
+                                   json.dumps({ "message": str(e) }).encode('utf-8'),False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                alive = keep_alive(version,headers)
+                status, response_headers, response_body = await self.respond(method,target,headers,body)
+                write_response(writer,status,response_headers,response_body,alive,method == "HEAD")
+                await writer.drain()
+                if not alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self,host="127.0.0.1",port=3000):
+        return await asyncio.start_server(self.handle_connection,host,port)
+
+    def close(self):
+        self.executor.shutdown()
+
+async def main(args):
+    emulator = Emulator(workers=args.workers,processes=args.processes,max_body=args.max_body)
+    server = await emulator.serve(args.host,args.port)
+    host, port = server.sockets[0].getsockname()[:2]
+    kind = "processes" if args.processes else "threads"
+    print(f"Serving on http://{host}:{port}/{gateway.STAGE} with {args.workers} worker {kind}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        emulator.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--processes", action="store_true")
+    parser.add_argument("--max-body", type=int, default=MAX_BODY)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
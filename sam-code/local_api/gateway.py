@@ -0,0 +1,251 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import importlib
+import json
+import os
+import sys
+import time
+import uuid
+from base64       import b64decode, b64encode
+from http.server  import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import yaml
+
+# Local stand-in for API Gateway HTTP APIs. Routes come from template.yaml,
+# requests are translated into payload format 2.0 events like the ones in
+# events/ and handler responses back into HTTP responses.
+
+SAM_DIR  = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+TEMPLATE = os.path.join(SAM_DIR, "template.yaml")
+STAGE    = "prod"
+
+# API Gateway passes these through as text, everything else is base64 encoded
+TEXT_TYPES = ("text/", "application/json", "application/javascript", "application/xml")
+
+class _TemplateLoader(yaml.SafeLoader):
+    pass
+
+def _intrinsic(loader,suffix,node):
+    # Keep short form intrinsics like !Ref as their long form, e.g. {"Ref": name}
+    name = "Ref" if suffix == "Ref" else "Fn::" + suffix
+    if isinstance(node,yaml.ScalarNode):
+        return { name: loader.construct_scalar(node) }
+    if isinstance(node,yaml.SequenceNode):
+        return { name: loader.construct_sequence(node) }
+    return { name: loader.construct_mapping(node) }
+
+_TemplateLoader.add_multi_constructor("!", _intrinsic)
+
+class Route:
+    def __init__(self,path,method,module,function,code_dirs,cors=None):
+        self.path      = path
+        self.method    = method
+        self.module    = module
+        self.function  = function
+        self.code_dirs = code_dirs
+        # CorsConfiguration of the HTTP API the route belongs to, if any
+        self.cors      = cors
+        self._handler  = None
+
+    def matches(self,method,path):
+        return path == self.path and self.method in ("ANY", method)
+
+    def handler(self):
+        # Import on first use, the same way Lambda finds the handler
+        if self._handler is None:
+            for code_dir in reversed(self.code_dirs):
+                if code_dir not in sys.path:
+                    sys.path.insert(0, code_dir)
+            self._handler = getattr(importlib.import_module(self.module), self.function)
+        return self._handler
+
+def load_routes(template=TEMPLATE):
+    with open(template) as fh:
+        resources = yaml.load(fh,Loader=_TemplateLoader)["Resources"]
+    layers = [
+        os.path.normpath(os.path.join(SAM_DIR, properties["Properties"]["ContentUri"]))
+        for properties in resources.values()
+        if properties["Type"] == "AWS::Serverless::LayerVersion"
+        ]
+    routes = []
+    for properties in resources.values():
+        if properties["Type"] != "AWS::Serverless::Function":
+            continue
+        module, function = properties["Properties"]["Handler"].rsplit(".",1)
+        code_dirs = [os.path.normpath(os.path.join(SAM_DIR, properties["Properties"]["CodeUri"]))] + layers
+        for event in properties["Properties"].get("Events",{}).values():
+            if event["Type"] == "HttpApi":
+                api_id = (event["Properties"].get("ApiId") or {}).get("Ref")
+                api    = resources.get(api_id,{}).get("Properties",{})
+                routes.append(Route(
+                    event["Properties"]["Path"], event["Properties"]["Method"].upper(),
+                    module, function, code_dirs, api.get("CorsConfiguration")
+                    ))
+    return routes
+
+def find_route(routes,method,path):
+    for route in routes:
+        if route.matches(method,path):
+            return route
+    return None
+
+def build_event(method,target,headers,body,route_path):
+    # target is the request target, e.g. /prod/noise?w=100&h=50. headers is a
+    # list of (name, value) pairs, repeated headers are joined with commas.
+    url = urlsplit(target)
+    event_headers = {}
+    for name, value in headers:
+        name = name.lower()
+        event_headers[name] = event_headers[name] + "," + value if name in event_headers else value
+    query = {}
+    for name, value in parse_qsl(url.query, keep_blank_values=True):
+        query[name] = query[name] + "," + value if name in query else value
+    now = time.time()
+    event = {
+        "version": "2.0",
+        "routeKey": f"ANY {route_path}",
+        "rawPath": url.path,
+        "rawQueryString": url.query,
+        "headers": event_headers,
+        "requestContext": {
+            "accountId": "123456789012",
+            "apiId": "local",
+            "domainName": event_headers.get("host","localhost"),
+            "domainPrefix": "local",
+            "http": {
+                "method": method,
+                "path": url.path,
+                "protocol": "HTTP/1.1",
+                "sourceIp": "127.0.0.1",
+                "userAgent": event_headers.get("user-agent","")
+            },
+            "requestId": uuid.uuid4().hex,
+            "routeKey": f"ANY {route_path}",
+            "stage": STAGE,
+            "time": time.strftime("%d/%b/%Y:%H:%M:%S +0000", time.gmtime(now)),
+            "timeEpoch": int(now * 1000)
+        },
+        "isBase64Encoded": False
+    }
+    if query:
+        event["queryStringParameters"] = query
+    if body:
+        if event_headers.get("content-type","").startswith(TEXT_TYPES):
+            event["body"] = body.decode('utf-8')
+        else:
+            event["body"] = b64encode(body).decode('ascii')
+            event["isBase64Encoded"] = True
+    return event
+
+def build_http_response(response):
+    # Returns (status code, list of headers, body bytes) for a handler response
+    if not isinstance(response,dict) or "statusCode" not in response:
+        # Payload format 2.0 treats anything else as a JSON body
+        return 200, [("Content-Type","application/json")], json.dumps(response).encode('utf-8')
+    body = response.get("body","")
+    if isinstance(body,(str,bytes)):
+        if response.get("isBase64Encoded",False):
+            body = b64decode(body)
+        elif isinstance(body,str):
+            body = body.encode('utf-8')
+    else:
+        # Streamed response, a generator of raw bytes
+        body = b"".join(body)
+    headers = [(str(name), str(value)) for name, value in response.get("headers",{}).items()]
+    headers = [(name, value) for name, value in headers if name.lower() != "content-length"]
+    headers += [("Set-Cookie", cookie) for cookie in response.get("cookies",[])]
+    return response["statusCode"], headers, body
+
+def cors_headers(cors,request_headers):
+    # Headers API Gateway adds for a CORS configuration, request_headers is the
+    # event style dict with lower case names
+    origin = request_headers.get("origin")
+    if not cors or origin is None:
+        return []
+    allowed = cors.get("AllowOrigins",[])
+    if "*" not in allowed and origin not in allowed:
+        return []
+    headers = [("Access-Control-Allow-Origin", "*" if "*" in allowed else origin)]
+    if "access-control-request-method" in request_headers:
+        headers.append(("Access-Control-Allow-Methods", ",".join(cors.get("AllowMethods",[]))))
+        headers.append(("Access-Control-Allow-Headers", ",".join(name.lower() for name in cors.get("AllowHeaders",[]))))
+        if "MaxAge" in cors:
+            headers.append(("Access-Control-Max-Age", str(cors["MaxAge"])))
+    return headers
+
+def is_preflight(route,method,request_headers):
+    # With CORS configured API Gateway answers preflight requests itself
+    return (route is not None and route.cors is not None and method == "OPTIONS"
+            and "origin" in request_headers and "access-control-request-method" in request_headers)
+
+def add_cors(headers,extra):
+    # Handler set CORS headers win over the generated ones
+    present = { name.lower() for name, _ in headers }
+    return headers + [(name, value) for name, value in extra if name.lower() not in present]
+
+def invoke(route,event):
+    try:
+        return build_http_response(route.handler()(event, None))
+    except Exception as e:
+        # API Gateway hides function errors behind a 500
+        print(f"Handler error: {e!r}", file=sys.stderr)
+        return 500, [("Content-Type","application/json")], b'{"message":"Internal Server Error"}'
+
+def strip_stage(path):
+    prefix = "/" + STAGE
+    return path[len(prefix):] if path.startswith(prefix + "/") else path
+
+class GatewayRequestHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests like API Gateway does, headers and
+    # body go out in separate writes so Nagle's algorithm would stall keep-alive
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    routes = []
+
+    def handle_any(self):
+        body  = self.rfile.read(int(self.headers.get("content-length",0) or 0))
+        path  = strip_stage(urlsplit(self.path).path)
+        route = find_route(self.routes, self.command, path)
+        request_headers = { name.lower(): value for name, value in self.headers.items() }
+        if route is None:
+            status, headers, body = 404, [("Content-Type","application/json")], b'{"message":"Not Found"}'
+        elif is_preflight(route, self.command, request_headers):
+            status, headers, body = 204, cors_headers(route.cors, request_headers), b""
+        else:
+            status, headers, body = invoke(route, build_event(self.command, self.path, self.headers.items(), body, route.path))
+            headers = add_cors(headers, cors_headers(route.cors, request_headers))
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_OPTIONS = do_HEAD = handle_any
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host="127.0.0.1",port=3000,routes=None):
+    # Threaded server, returns it so the caller can run serve_forever() where it likes
+    handler = type("Handler", (GatewayRequestHandler,), { "routes": routes if routes is not None else load_routes() })
+    return ThreadingHTTPServer((host,port), handler)
+
+if __name__ == "__main__":
+    server = serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 3000)
+    print(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}/{STAGE}")
+    server.serve_forever()
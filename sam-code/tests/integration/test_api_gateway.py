@@ -23,6 +23,8 @@ import requests
 
 """
 Make sure env variable AWS_SAM_STACK_NAME exists with the name of the stack we are going to test. 
+To run against the local emulator instead, set NOISE_API_ENDPOINT, e.g.
+http://127.0.0.1:3000/prod/noise after starting python -m local_api.emulator
 """
 
 
@@ -51,6 +53,10 @@ class TestApiGateway(TestCase):
         Based on the provided env variable AWS_SAM_STACK_NAME,
         here we use cloudformation API to find out what the NoiseHttpApi URL is
         """
+        self.api_endpoint = os.environ.get("NOISE_API_ENDPOINT")
+        if self.api_endpoint:
+            return
+
         stack_name = TestApiGateway.get_stack_name()
 
         client = boto3.client("cloudformation")
@@ -0,0 +1,116 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+
+import pytest
+
+import admission
+from img_api import app
+
+class Context:
+    def __init__(self,remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+def get_event(w,h,accept):
+    return {
+        "headers": {"accept": accept},
+        "queryStringParameters": {"w": str(w), "h": str(h)},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+
+@pytest.fixture(autouse=True)
+def no_lambda_memory(monkeypatch):
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", raising=False)
+
+def test_estimate_scales_with_pixels_and_channels():
+    small = admission.estimate(1000, "PNG")
+    large = admission.estimate(4000, "PNG", channels=3)
+    assert large["response_bytes"] == 12 * small["response_bytes"]
+    assert large["peak_bytes"] > small["peak_bytes"]
+    assert admission.estimate(1000, "PNG", "POST", 5000)["cpu_ms"] > small["cpu_ms"]
+
+def test_limits_follow_lambda_settings(monkeypatch):
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "1024")
+    limit = admission.limits(Context(3000))
+    assert limit["memory_bytes"] == int(1024 * 2**20 * admission.headroom)
+    assert limit["time_ms"] == int(3000 * admission.headroom)
+    assert limit["cpu_share"] == pytest.approx(1024 / admission.FULL_CPU_MB)
+    assert admission.limits("")["time_ms"] is None
+
+def test_downgrades_to_cheaper_accepted_format(monkeypatch):
+    monkeypatch.setattr(admission, "MAX_RESPONSE_BYTES", 10000)
+    ret = app.lambda_handler(get_event(100, 100, "image/png,*/*;q=0.5"), "")
+    assert ret["statusCode"] == 200
+    assert ret["headers"]["Content-Type"] == "image/jpeg"
+
+def test_rejects_oversized_response_with_estimate(monkeypatch, mocker):
+    monkeypatch.setattr(admission, "MAX_RESPONSE_BYTES", 10000)
+    spy = mocker.spy(app, "generate_noise_img")
+    ret = app.lambda_handler(get_event(100, 100, "image/png"), "")
+    assert ret["statusCode"] == 413
+    body = json.loads(ret["body"])
+    assert body["exceeded"] == ["response_bytes"]
+    assert body["estimate"]["format"] == "PNG"
+    assert body["limits"]["response_bytes"] == 10000
+    assert spy.call_count == 0
+
+def test_response_size_has_a_margin():
+    # Estimated a little under the limit, encoded a little over it
+    ret = app.lambda_handler(get_event(2915, 2915, "image/jpeg"), "")
+    assert ret["statusCode"] == 413
+    assert json.loads(ret["body"])["exceeded"] == ["response_bytes"]
+    ret = app.lambda_handler(get_event(2770, 2770, "image/jpeg"), "")
+    assert ret["statusCode"] == 200
+    assert len(ret["body"]) <= admission.MAX_RESPONSE_BYTES
+
+def test_rejects_work_beyond_memory(monkeypatch):
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "128")
+    ret = app.lambda_handler(get_event(100000, 100000, "image/jpeg"), "")
+    assert ret["statusCode"] == 413
+    assert "memory_bytes" in json.loads(ret["body"])["exceeded"]
+    ret = app.lambda_handler(get_event(2750, 2750, "image/jpeg"), "")
+    assert ret["statusCode"] == 422
+    assert json.loads(ret["body"])["exceeded"] == ["memory_bytes"]
+
+def test_rejects_work_beyond_remaining_time():
+    ret = app.lambda_handler(get_event(512, 512, "image/avif"), Context(10))
+    assert ret["statusCode"] == 422
+    assert json.loads(ret["body"])["exceeded"] == ["time_ms"]
+
+def test_rejects_empty_images():
+    ret = app.lambda_handler(get_event(0, 10, "image/png"), "")
+    assert ret["statusCode"] == 422
+
+def test_post_plans_from_image_header():
+    with open(app.__file__, 'rb') as fh:
+        assert app.planned_size(fh.read(), "image/png", 10, 10) is None
+    assert app.planned_size(b"hello", "text/plain", 10, 20) == (10 * max(20, app.text_render.max_height), 1)
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(admission, "enabled_flag", False)
+    monkeypatch.setattr(admission, "MAX_RESPONSE_BYTES", 10)
+    assert app.lambda_handler(get_event(10, 10, "image/png"), "")["statusCode"] == 200
+
+def test_load_model_merges_calibration(tmp_path):
+    path = tmp_path / "model.json"
+    path.write_text(json.dumps({"fixed_ms": 5.0, "formats": {"PNG": {"ns_per_pixel": 1.0}}}))
+    model = admission.load_model(str(path))
+    assert model["fixed_ms"] == 5.0
+    assert model["formats"]["PNG"] == {"ns_per_pixel": 1.0}
+    assert model["formats"]["JPEG"] == admission.DEFAULT_MODEL["formats"]["JPEG"]
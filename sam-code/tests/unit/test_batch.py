@@ -0,0 +1,97 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import zipfile
+from base64       import b64decode, b64encode
+from email.parser import BytesParser
+from email.policy import HTTP
+from io           import BytesIO
+
+import admission
+import batch
+from PIL import Image
+
+def batch_event(body,content_type="application/json",accept="application/zip"):
+    return {
+        "headers": {"accept": accept, "content-type": content_type},
+        "queryStringParameters": {},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": b64encode(body).decode('ascii'),
+        "isBase64Encoded": True,
+    }
+
+def png_bytes(size):
+    img_buffer = BytesIO()
+    Image.new('RGB',size,(255,0,0)).save(img_buffer,format="PNG")
+    return img_buffer.getvalue()
+
+def test_batch_zip_reports_item_errors():
+    body = json.dumps({"items": [
+        {"w": 10, "h": 5, "format": "image/png"},
+        {"w": 10, "h": 5, "format": "image/unknown"},
+        {"image": b64encode(png_bytes((8,8))).decode('ascii'), "content-type": "image/png", "format": "image/gif"},
+    ]}).encode('utf-8')
+    ret = batch.lambda_handler(batch_event(body), "")
+    assert ret["statusCode"] == 200
+    archive  = zipfile.ZipFile(BytesIO(b64decode(ret["body"])))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [entry["status"] for entry in manifest] == ["ok", "error", "ok"]
+    assert Image.open(BytesIO(archive.read(manifest[0]["file"]))).size == (10,5)
+    assert Image.open(BytesIO(archive.read(manifest[2]["file"]))).format == 'GIF'
+
+def test_batch_multipart_in_and_out():
+    boundary = "testboundary"
+    body = b"".join(
+        f"--{boundary}\r\nContent-Type: image/png\r\nContent-Disposition: form-data; name=\"f{i}\"; filename=\"f{i}.png\"\r\n\r\n".encode('utf-8')
+        + png_bytes((4+i,4)) + b"\r\n"
+        for i in range(3)
+        ) + f"--{boundary}--\r\n".encode('utf-8')
+    event = batch_event(body, f"multipart/form-data; boundary={boundary}", "multipart/mixed")
+    event["queryStringParameters"]["format"] = "image/png"
+    ret = batch.lambda_handler(event, "")
+    assert ret["statusCode"] == 200
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + ret["headers"]["Content-Type"].encode('utf-8') + b"\r\n\r\n" + b64decode(ret["body"]))
+    parts = list(message.iter_parts())
+    assert [Image.open(BytesIO(part.get_payload(decode=True))).size for part in parts] == [(4,4),(5,4),(6,4)]
+    assert all(part["X-Item-Status"] == "ok" for part in parts)
+
+def test_batch_rejects_bad_request(monkeypatch):
+    assert batch.lambda_handler(batch_event(b"not json"), "")["statusCode"] == 400
+    monkeypatch.setattr(batch, "batch_max_items", 1)
+    body = json.dumps({"items": [{}, {}]}).encode('utf-8')
+    assert batch.lambda_handler(batch_event(body), "")["statusCode"] == 413
+
+def test_batch_items_past_response_limit_are_errors():
+    # About 117 KB of base64 per item, the whole batch would be 9 MB
+    body = json.dumps({"items": [{"w": 256, "h": 256, "format": "image/png"}] * 80}).encode('utf-8')
+    for accept in ("application/zip", "multipart/mixed"):
+        ret = batch.lambda_handler(batch_event(body, accept=accept), "")
+        assert ret["statusCode"] == 200
+        assert len(ret["body"]) <= admission.MAX_RESPONSE_BYTES
+    archive  = zipfile.ZipFile(BytesIO(b64decode(batch.lambda_handler(batch_event(body), "")["body"])))
+    statuses = [entry["status"] for entry in json.loads(archive.read("manifest.json"))]
+    assert statuses[0] == "ok" and statuses[-1] == "error"
+    assert statuses == sorted(statuses, reverse=True)
+
+def test_batch_item_too_large_is_not_generated(mocker):
+    spy  = mocker.spy(batch.app, "generate_noise_img")
+    body = json.dumps({"items": [{"w": 100000, "h": 100000}, {"w": 8, "h": 8}]}).encode('utf-8')
+    archive  = zipfile.ZipFile(BytesIO(b64decode(batch.lambda_handler(batch_event(body), "")["body"])))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert [entry["status"] for entry in manifest] == ["error", "ok"]
+    assert "response_bytes" in manifest[0]["error"]
+    assert spy.call_count == 1
@@ -0,0 +1,47 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+
+import pytest
+from PIL import Image
+
+import composite
+import noise
+
+def random_image(mode,size):
+    return Image.frombytes(mode, size, os.urandom(size[0] * size[1] * len(Image.new(mode,(1,1)).tobytes())))
+
+def pasted(image,top,noise_buf):
+    # What overlay_noise_on_image did before the composite module
+    expected = image.copy()
+    noise_image = Image.frombuffer('L',(image.width,len(noise_buf) // image.width),bytes(noise_buf),'raw','L',0,1)
+    expected.paste(noise_image,(0,top),noise_image)
+    return expected
+
+@pytest.mark.parametrize("engine", sorted(composite.engines))
+@pytest.mark.parametrize("mode", ["L", "RGB", "LA", "RGBA", "CMYK"])
+def test_overlay_matches_paste(engine, mode):
+    image = random_image(mode,(97,40))
+    noise_buf = noise.noise_bytes(97 * 25, 0, 256, seed=7)
+    expected = pasted(image,10,noise_buf)
+    assert composite.overlay(image,10,noise_buf,engine).tobytes() == expected.tobytes()
+
+@pytest.mark.parametrize("engine", sorted(composite.engines))
+def test_overlay_extremes(engine):
+    image = Image.new("RGBA",(256,2),(255,0,128,0))
+    noise_buf = bytes(range(256)) * 2
+    expected = pasted(image,0,noise_buf)
+    assert composite.overlay(image,0,noise_buf,engine).tobytes() == expected.tobytes()
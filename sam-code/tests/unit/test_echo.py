@@ -0,0 +1,118 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+from base64 import b64decode, b64encode
+
+import pytest
+
+import echo_json
+import echo_raw
+
+DATA = os.urandom(1000)
+
+def event(body,headers=None,encoded=True):
+    return {
+        "headers": headers or {},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": b64encode(body).decode('ascii') if encoded else body,
+        "isBase64Encoded": encoded,
+    }
+
+@pytest.fixture
+def fast(monkeypatch):
+    monkeypatch.setattr(echo_raw, "mode", "fast")
+
+def test_full_mode_echoes_all_headers():
+    headers = {"content-type": "image/gif", "content-length": "1000", "x-amzn-trace-id": "Root=1"}
+    response = echo_raw.lambda_handler(event(DATA,headers), "")
+    assert response["headers"] == headers
+
+def test_fast_mode_whitelists_headers(fast):
+    headers = {"content-type": "image/gif", "content-length": "1000", "x-forwarded-for": "1.2.3.4"}
+    response = echo_raw.lambda_handler(event(DATA,headers), "")
+    assert response["statusCode"] == 200
+    assert response["headers"] == {"content-type": "image/gif", "accept-ranges": "bytes"}
+    assert b64decode(response["body"]) == DATA
+
+@pytest.mark.parametrize("body", ["QUJD=", "QU JD", "QUJD\n", "Q=JD", "QUJ==", "QUJ\u00e9"])
+def test_fast_mode_rejects_malformed_base64(fast, body):
+    response = echo_raw.lambda_handler({"body": body, "isBase64Encoded": True}, "")
+    assert response["statusCode"] == 400
+
+def test_base64_length():
+    for size in range(10):
+        assert echo_raw.base64_length(b64encode(DATA[:size]).decode('ascii')) == size
+
+@pytest.mark.parametrize("header,first,last", [
+    ("bytes=0-0", 0, 0),
+    ("bytes=1-4", 1, 4),
+    ("bytes=500-", 500, 999),
+    ("bytes=-10", 990, 999),
+    ("bytes=998-5000", 998, 999),
+])
+def test_fast_mode_range(fast, header, first, last):
+    response = echo_raw.lambda_handler(event(DATA,{"range": header}), "")
+    assert response["statusCode"] == 206
+    assert response["headers"]["content-range"] == f"bytes {first}-{last}/1000"
+    assert b64decode(response["body"]) == DATA[first:last + 1]
+
+def test_fast_mode_range_of_text_body(fast):
+    response = echo_raw.lambda_handler(event("hello world",{"range": "bytes=6-"},encoded=False), "")
+    assert b64decode(response["body"]) == b"world"
+
+def test_fast_mode_unsatisfiable_range(fast):
+    response = echo_raw.lambda_handler(event(DATA,{"range": "bytes=1000-"}), "")
+    assert response["statusCode"] == 416
+    assert response["headers"]["content-range"] == "bytes */1000"
+
+def test_fast_mode_ignores_multiple_ranges(fast):
+    response = echo_raw.lambda_handler(event(DATA,{"range": "bytes=0-1,5-6"}), "")
+    assert response["statusCode"] == 200
+    assert b64decode(response["body"]) == DATA
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(echo_json, "orjson", None)
+        monkeypatch.setattr(echo_json, "item_separator", ", ")
+        monkeypatch.setattr(echo_json, "key_separator", ": ")
+    elif echo_json.orjson is None:
+        pytest.skip("orjson is not installed")
+
+@pytest.mark.parametrize("sample", [
+    event(DATA),
+    event('say "hi"\n',encoded=False),
+    {"requestContext": {"http": {"method": "GET"}}},
+    {"body": "QUJD", "isBase64Encoded": True},
+])
+def test_echo_json_round_trips(backend, sample):
+    response = echo_json.lambda_handler(sample, "")
+    assert json.loads(response["body"]) == sample
+
+def test_echo_json_matches_dumps(backend):
+    sample = event(DATA,{"content-type": "image/gif"})
+    expected = {key: value for key, value in sample.items() if key != "body"}
+    expected["body"] = sample["body"]
+    assert "".join(echo_json.iter_json(sample)) == echo_json.dumps(expected)
+
+def test_echo_json_summarizes_large_bodies(monkeypatch):
+    monkeypatch.setattr(echo_json, "max_body", 8)
+    sample = event(DATA)
+    body = json.loads(echo_json.lambda_handler(sample, "")["body"])["body"]
+    assert body["truncated"] == sample["body"][:8]
+    assert body["length"] == len(sample["body"])
+    assert len(body["sha256"]) == 16
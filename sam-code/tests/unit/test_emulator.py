@@ -0,0 +1,76 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import asyncio
+import json
+
+from local_api import emulator
+
+async def exchange(requests,**options):
+    # Sends raw requests over one connection, returns the raw response bytes
+    server = emulator.Emulator(**options)
+    listener = await server.serve("127.0.0.1",0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1",port)
+        for request in requests:
+            writer.write(request)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(),10)
+        writer.close()
+        return data, server.stats()
+    finally:
+        listener.close()
+        await listener.wait_closed()
+        server.close()
+
+def run(requests,**options):
+    return asyncio.run(exchange(requests,**options))
+
+def test_keep_alive_serves_several_requests_per_connection():
+    echo = b"POST /prod/echoraw HTTP/1.1\r\nHost: x\r\nContent-Type: text/plain\r\nContent-Length: 5\r\n\r\nhello"
+    close = b"GET /prod/missing HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"
+    data, stats = run([echo, echo, close])
+    assert data.count(b"HTTP/1.1 200 OK") == 2
+    assert data.count(b"\r\n\r\nhello") == 2
+    assert b"HTTP/1.1 404 Not Found" in data
+    assert stats["requests"] == 2
+
+def test_chunked_request_body():
+    request = (b"POST /prod/echoraw HTTP/1.1\r\nHost: x\r\nContent-Type: text/plain\r\n"
+               b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+               b"3\r\nhel\r\n2\r\nlo\r\n0\r\n\r\n")
+    data, _ = run([request])
+    head, _, body = data.partition(b"\r\n\r\n")
+    assert b"Content-Length: 5" in head and b"transfer-encoding" not in head.lower()
+    assert body == b"hello"
+
+def test_body_over_limit_is_rejected():
+    request = b"POST /prod/echoraw HTTP/1.1\r\nHost: x\r\nContent-Length: 100\r\n\r\n" + b"x" * 100
+    data, stats = run([request],max_body=10)
+    assert data.startswith(b"HTTP/1.1 413")
+    assert stats["requests"] == 0
+
+def test_cors_preflight_does_not_invoke_handler():
+    request = (b"OPTIONS /prod/noise HTTP/1.1\r\nHost: x\r\nOrigin: https://example.com\r\n"
+               b"Access-Control-Request-Method: GET\r\nConnection: close\r\n\r\n")
+    data, stats = run([request])
+    assert data.startswith(b"HTTP/1.1 204")
+    assert b"Access-Control-Allow-Origin: *" in data
+    assert stats["requests"] == 0
+
+def test_stats_endpoint():
+    data, _ = run([b"GET /_emulator/stats HTTP/1.0\r\n\r\n"],workers=3)
+    assert json.loads(data.partition(b"\r\n\r\n")[2])["workers"] == 3
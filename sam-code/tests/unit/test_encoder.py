@@ -0,0 +1,91 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import zlib
+from base64 import b64encode
+from io     import BytesIO
+
+import pytest
+from PIL import Image, ImageCms
+
+import encoder
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 11, 12, 13, 1000])
+def test_b64encode_view_matches_b64encode(size, monkeypatch):
+    monkeypatch.setattr(encoder, "B64_CHUNK", 6)
+    data = os.urandom(size)
+    assert encoder.b64encode_view(data) == b64encode(data).decode('ascii')
+    assert encoder.b64encode_view(memoryview(data)) == b64encode(data).decode('ascii')
+
+def test_b64encode_view_reuses_larger_buffer():
+    encoder.b64encode_view(bytes(300))
+    assert encoder.b64encode_view(b"abc") == "YWJj"
+
+def test_encode_view_is_image_file():
+    view = encoder.encode_view(Image.new('L',(10,5)),"PNG")
+    assert Image.open(BytesIO(view)).size == (10,5)
+
+def test_iter_encoded_yields_complete_file():
+    image = Image.frombytes('L',(300,200),os.urandom(300*200))
+    chunks = list(encoder.iter_encoded(image,"PNG"))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == bytes(encoder.encode_view(image,"PNG"))
+
+def test_iter_encoded_stops_encoder_when_closed_early(monkeypatch):
+    monkeypatch.setattr(encoder, "STREAM_QUEUE_DEPTH", 1)
+    image = Image.frombytes('L',(500,500),os.urandom(500*500))
+    stream = encoder.iter_encoded(image,"PNG")
+    next(stream)
+    stream.close()
+
+def test_iter_encoded_raises_encoder_errors():
+    with pytest.raises(OSError):
+        list(encoder.iter_encoded(Image.new('RGBA',(4,4)),"JPEG"))
+
+def test_adler32_combine():
+    first, second = os.urandom(1000), os.urandom(70000)
+    assert encoder.adler32_combine(zlib.adler32(first),zlib.adler32(second),len(second)) == zlib.adler32(first + second)
+
+@pytest.mark.parametrize("mode", ["L", "LA", "RGB", "RGBA"])
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_encode_view_parallel_png(mode, use_numpy, monkeypatch, mocker):
+    monkeypatch.setattr(encoder, "encode_workers", 3)
+    monkeypatch.setattr(encoder, "parallel_min_pixels", 1)
+    monkeypatch.setattr(encoder, "PNG_GROUP_BYTES", 1000)
+    if not use_numpy:
+        monkeypatch.setattr(encoder, "numpy", None)
+    parallel_png = mocker.spy(encoder, "encode_png_parallel")
+    image = Image.radial_gradient('L').resize((301,207)).convert(mode)
+    parallel = encoder.encode_view(image,"PNG")
+    assert parallel_png.call_count == 1
+    decoded = Image.open(BytesIO(parallel))
+    assert decoded.mode == mode
+    assert decoded.tobytes() == image.tobytes()
+
+@pytest.mark.parametrize("info", [
+    {"icc_profile": ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()},
+    {"transparency": (1, 2, 3)},
+])
+def test_encode_view_png_metadata_is_kept(info, monkeypatch, mocker):
+    monkeypatch.setattr(encoder, "encode_workers", 3)
+    monkeypatch.setattr(encoder, "parallel_min_pixels", 1)
+    parallel_png = mocker.spy(encoder, "encode_png_parallel")
+    image = Image.radial_gradient('L').convert('RGB')
+    image.info.update(info)
+    decoded = Image.open(BytesIO(encoder.encode_view(image,"PNG")))
+    assert parallel_png.call_count == 0
+    for key, value in info.items():
+        assert decoded.info[key] == value
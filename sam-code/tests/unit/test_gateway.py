@@ -0,0 +1,54 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+from base64 import b64encode
+
+from local_api import gateway
+
+def test_load_routes_follows_template():
+    routes = { (route.method, route.path): route for route in gateway.load_routes() }
+    assert routes[("ANY","/noise")].module == "app"
+    assert routes[("ANY","/echojson")].module == "echo_json"
+    assert routes[("POST","/noise/batch")].module == "batch"
+    assert any(code_dir.endswith("instrument_layer") for code_dir in routes[("ANY","/noise")].code_dirs)
+
+def test_build_event_matches_fixture_shape():
+    event = gateway.build_event(
+        "GET", "/prod/noise?w=100&h=50",
+        [("Accept","image/png"), ("X-Multi","a"), ("X-Multi","b")],
+        b"", "/noise")
+    assert event["version"] == "2.0"
+    assert event["rawPath"] == "/prod/noise"
+    assert event["queryStringParameters"] == {"w": "100", "h": "50"}
+    assert event["headers"] == {"accept": "image/png", "x-multi": "a,b"}
+    assert event["requestContext"]["http"]["method"] == "GET"
+    assert "body" not in event
+
+def test_build_event_encodes_binary_bodies():
+    text = gateway.build_event("POST", "/prod/echoraw", [("Content-Type","text/plain")], b"hello", "/echoraw")
+    assert text["body"] == "hello" and not text["isBase64Encoded"]
+    binary = gateway.build_event("POST", "/prod/echoraw", [("Content-Type","image/gif")], b"GIF89a", "/echoraw")
+    assert binary["body"] == b64encode(b"GIF89a").decode('ascii') and binary["isBase64Encoded"]
+
+def test_build_http_response():
+    status, headers, body = gateway.build_http_response({
+        "statusCode": 200, "headers": {"Content-Type": "image/gif", "content-length": "1"},
+        "body": b64encode(b"GIF89a").decode('ascii'), "isBase64Encoded": True})
+    assert (status, headers, body) == (200, [("Content-Type","image/gif")], b"GIF89a")
+    status, headers, body = gateway.build_http_response({"message": "hi"})
+    assert status == 200 and json.loads(body) == {"message": "hi"}
+    status, headers, body = gateway.build_http_response({"statusCode": 200, "body": iter([b"a", b"b"])})
+    assert body == b"ab"
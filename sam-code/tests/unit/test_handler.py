@@ -19,7 +19,7 @@ import os
 import pytest
 
 from img_api import app
-from base64  import b64decode
+from base64  import b64decode, b64encode
 from PIL     import Image
 from io      import BytesIO
 
@@ -29,6 +29,12 @@ EVENTS_DIR = os.path.realpath(
         '../../events'
     ))
 
+TESTDATA_DIR = os.path.realpath(
+    os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        '../../../testdata'
+    ))
+
 @pytest.mark.datafiles(os.path.join(EVENTS_DIR,'event_unknown_image_type_default.json'))
 def test_lambda_handler_unknown_image_type_plain(datafiles, mocker):
     with open(os.path.join(datafiles,'event_unknown_image_type_default.json')) as fh:
@@ -89,3 +95,245 @@ def test_lambda_handler_bmp_size_and_greyscale(datafiles, mocker):
     assert Image.open(BytesIO(b64decode(ret["body"]))).format == 'BMP'
     assert Image.open(BytesIO(b64decode(ret["body"]))).size == (100,50)
 
+@pytest.mark.datafiles(os.path.join(EVENTS_DIR,'event_png_size_and_greyscale.json'))
+def test_stream_handler_png_size_and_greyscale(datafiles, mocker):
+    with open(os.path.join(datafiles,'event_png_size_and_greyscale.json')) as fh:
+        event_png_size_and_greyscale = json.load(fh)        
+    ret = app.stream_handler(event_png_size_and_greyscale, "")
+    assert ret["statusCode"] == 200
+    assert ret["headers"]["Content-Type"] == 'image/png'
+    image = Image.open(BytesIO(b"".join(ret["body"])))
+    assert image.format == 'PNG'
+    assert image.size == (100,50)
+
+@pytest.mark.datafiles(os.path.join(EVENTS_DIR,'event_unknown_image_type_default.json'))
+def test_stream_handler_unknown_image_type(datafiles, mocker):
+    with open(os.path.join(datafiles,'event_unknown_image_type_default.json')) as fh:
+        event_unknown_image_type_default = json.load(fh)        
+    ret = app.stream_handler(event_unknown_image_type_default, "")
+    assert ret["statusCode"] == 400
+    assert b"".join(ret["body"]) == b'Stream path: Unknown encoding requested'
+
+@pytest.mark.datafiles(os.path.join(TESTDATA_DIR,'rainbow-small.jpg'))
+@pytest.mark.parametrize("band_rows", [1, 7, 64, 1000])
+def test_overlay_bands_match_full_frame(datafiles, band_rows):
+    with open(os.path.join(datafiles,'rainbow-small.jpg'),'rb') as fh:
+        img_data = fh.read()
+    full   = app.overlay_noise_on_image(app.decode_img(img_data,'image/jpeg',0,0),10,200,seed=5,band_rows=0)
+    banded = app.overlay_noise_on_image(app.decode_img(img_data,'image/jpeg',0,0),10,200,seed=5,band_rows=band_rows)
+    assert full.tobytes() == banded.tobytes()
+
+def jpeg_bytes(size):
+    img_buffer = BytesIO()
+    Image.linear_gradient('L').resize(size).convert('RGB').save(img_buffer,format="JPEG")
+    return img_buffer.getvalue()
+
+@pytest.mark.parametrize("target,expected", [
+    ((100,50),    (100,50)),
+    ((100,None),  (100,75)),
+    ((None,300),  (400,300)),
+    ((1000,1000), (1000,1000)),
+])
+def test_decode_img_resizes_to_target(target, expected):
+    image = app.decode_img(jpeg_bytes((800,600)),'image/jpeg',0,0,target)
+    assert image.size == expected
+
+def test_decode_img_uses_jpeg_draft(mocker):
+    # 1/8 scale decode gives the requested size directly, nothing left to resize
+    img_data = jpeg_bytes((800,600))
+    resize = mocker.spy(Image.Image, "resize")
+    image = app.decode_img(img_data,'image/jpeg',0,0,(100,None))
+    assert image.size == (100,75)
+    assert resize.call_count == 0
+
+def test_lambda_handler_post_image_with_size():
+    event = {
+        "headers": {"accept": "image/png", "content-type": "image/jpeg"},
+        "queryStringParameters": {"w": "64"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": b64encode(jpeg_bytes((800,600))).decode('ascii'),
+        "isBase64Encoded": True,
+    }
+    ret = app.lambda_handler(event, "")
+    assert ret["statusCode"] == 200
+    assert Image.open(BytesIO(b64decode(ret["body"]))).size == (64,48)
+
+@pytest.mark.datafiles(os.path.join(TESTDATA_DIR,'multiline.txt'))
+def test_lambda_handler_post_text(datafiles):
+    with open(os.path.join(datafiles,'multiline.txt'),'rb') as fh:
+        body = fh.read().decode('utf-8')
+    event = {
+        "headers": {"accept": "image/gif", "content-type": "text/plain"},
+        "queryStringParameters": {"w": "100", "h": "100"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": body,
+        "isBase64Encoded": False,
+    }
+    ret = app.lambda_handler(event, "")
+    assert ret["statusCode"] == 200
+    assert Image.open(BytesIO(b64decode(ret["body"]))).format == 'GIF'
+
+def test_lambda_handler_options_reuses_encoded_image():
+    event = {
+        "headers": {"accept": "image/png"},
+        "requestContext": {"http": {"method": "OPTIONS"}},
+    }
+    first  = app.lambda_handler(event, "")
+    second = app.lambda_handler(event, "")
+    assert first == second
+    assert Image.open(BytesIO(b64decode(first["body"]))).size == (1,1)
+
+def test_only_known_codecs_are_registered():
+    assert set(app.known_conversions.values()) <= set(Image.SAVE)
+    assert "TIFF" not in Image.OPEN
+
+@pytest.mark.parametrize("mime_type,format", [("image/webp","WEBP"), ("image/avif","AVIF")])
+def test_lambda_handler_get_modern_formats(mime_type, format):
+    if mime_type not in app.known_conversions:
+        pytest.skip(f"Pillow build can not encode {format}")
+    event = {
+        "headers": {"accept": f"{mime_type},*/*;q=0.8"},
+        "queryStringParameters": {"w": "32", "h": "16"},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+    ret = app.lambda_handler(event, "")
+    assert ret["headers"]["Content-Type"] == mime_type
+    assert ret["headers"]["Vary"] == "Accept"
+    assert Image.open(BytesIO(b64decode(ret["body"]))).format == format
+
+def test_lambda_handler_get_negative_seed():
+    event = {
+        "headers": {"accept": "image/png"},
+        "queryStringParameters": {"w": "16", "h": "8", "seed": "-1"},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+    first = app.lambda_handler(event, "")
+    assert first["statusCode"] == 200
+    assert app.lambda_handler(event, "")["body"] == first["body"]
+
+def test_encode_settings_from_environment():
+    assert app.get_encode_settings({"WEBP_METHOD": "6", "PNG_COMPRESS_LEVEL": "1", "OTHER": "x"}) == {
+        "WEBP": {"method": 6},
+        "PNG":  {"compress_level": 1},
+        }
+    assert app.get_encode_settings({}) == {}
+
+@pytest.mark.parametrize("accept,format", [
+    ("image/avif,image/webp,*/*", "WEBP"),
+    ("image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8", "WEBP"),
+    ("*/*", "JPEG"),
+])
+def test_lambda_handler_post_prefers_webp(accept, format):
+    if "image/webp" not in app.known_conversions:
+        pytest.skip("Pillow build can not encode WEBP")
+    with open(os.path.join(TESTDATA_DIR,'rainbow-small.jpg'),'rb') as fh:
+        body = b64encode(fh.read()).decode('ascii')
+    event = {
+        "headers": {"accept": accept, "content-type": "image/jpeg"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": body,
+        "isBase64Encoded": True,
+    }
+    ret = app.lambda_handler(event, "")
+    assert ret["statusCode"] == 200
+    assert Image.open(BytesIO(b64decode(ret["body"]))).format == format
+
+def test_lambda_handler_get_prefers_jpeg():
+    event = {
+        "headers": {"accept": "image/avif,image/webp,*/*"},
+        "queryStringParameters": {"w": "16", "h": "8"},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+    assert app.lambda_handler(event, "")["headers"]["Content-Type"] == "image/jpeg"
+
+def test_encode_settings_are_passed_to_pillow(monkeypatch):
+    image = app.generate_noise_img(64,64,seed=1)
+    default = len(app.encode_img(image,"image/jpeg")["data"])
+    monkeypatch.setitem(app.encode_settings, "JPEG", {"quality": 10})
+    assert len(app.encode_img(image,"image/jpeg")["data"]) < default
+
+def image_bytes(image,format):
+    img_buffer = BytesIO()
+    image.save(img_buffer,format=format)
+    return img_buffer.getvalue()
+
+def palette_image(palette,transparency=None):
+    image = Image.new('P',(8,8))
+    image.putpalette(palette + [0] * (768 - len(palette)))
+    if transparency is not None:
+        image.info["transparency"] = transparency
+    return image
+
+@pytest.mark.parametrize("image,mode", [
+    (palette_image([0,0,0, 255,255,255]), "L"),
+    (palette_image([0,0,0, 128,128,128], transparency=0), "LA"),
+    (palette_image([255,0,0, 0,0,255]), "RGB"),
+    (palette_image([255,0,0, 0,0,255], transparency=1), "RGBA"),
+    (Image.new('1',(8,8)), "L"),
+    (Image.new('CMYK',(8,8)), "RGB"),
+    (Image.new('LA',(8,8)), "LA"),
+])
+def test_working_mode(image, mode):
+    assert app.working_mode(image) == mode
+
+@pytest.mark.parametrize("mime_type,format,mode", [
+    ("image/gif",  "GIF",  "L"),
+    ("image/png",  "PNG",  "L"),
+    ("image/jpeg", "JPEG", "L"),
+    ("image/bmp",  "BMP",  "L"),
+])
+def test_post_greyscale_gif_stays_single_channel(mime_type, format, mode):
+    with open(os.path.join(TESTDATA_DIR,'white.gif'),'rb') as fh:
+        body = b64encode(fh.read()).decode('ascii')
+    event = {
+        "headers": {"accept": mime_type, "content-type": "image/gif"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": body,
+        "isBase64Encoded": True,
+    }
+    output = Image.open(BytesIO(b64decode(app.lambda_handler(event, "")["body"])))
+    assert output.format == format
+    assert output.mode == mode or (format == "GIF" and output.mode == "P" and app.is_greyscale_palette(output))
+
+@pytest.mark.parametrize("mode", ["I;16", "I"])
+def test_16_bit_greyscale_is_scaled_to_8_bits(mode):
+    image = Image.new(mode,(2,1))
+    image.putpixel((1,0),65535)
+    image.putpixel((0,0),32896)
+    converted = app.convert_to_working_mode(image)
+    assert converted.mode == "L"
+    assert converted.tobytes() == bytes([128, 255])
+
+@pytest.mark.parametrize("mime_type,format", [("image/jpeg","JPEG"), ("image/bmp","BMP"), ("image/png","PNG")])
+def test_post_16_bit_png(mime_type, format):
+    event = {
+        "headers": {"accept": mime_type, "content-type": "image/png"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": b64encode(image_bytes(Image.new('I;16',(16,16),40000),"PNG")).decode('ascii'),
+        "isBase64Encoded": True,
+    }
+    ret = app.lambda_handler(event, "")
+    assert ret["statusCode"] == 200
+    output = Image.open(BytesIO(b64decode(ret["body"])))
+    assert (output.format, output.mode) == (format, "L")
+
+def test_post_text_renders_greyscale():
+    event = {
+        "headers": {"accept": "image/png", "content-type": "text/plain"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": "hello",
+        "isBase64Encoded": False,
+    }
+    assert Image.open(BytesIO(b64decode(app.lambda_handler(event, "")["body"]))).mode == "L"
+
+@pytest.mark.parametrize("mime_type,mode", [("image/jpeg","RGB"), ("image/png","RGBA")])
+def test_post_rgba_is_converted_only_when_needed(mime_type, mode):
+    event = {
+        "headers": {"accept": mime_type, "content-type": "image/png"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": b64encode(image_bytes(Image.new('RGBA',(16,16),(255,0,0,128)),"PNG")).decode('ascii'),
+        "isBase64Encoded": True,
+    }
+    ret = app.lambda_handler(event, "")
+    assert ret["statusCode"] == 200
+    assert Image.open(BytesIO(b64decode(ret["body"]))).mode == mode
@@ -0,0 +1,89 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import time
+
+import instrument
+import echo_raw
+from img_api import app
+
+BODY = "QUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFB"
+
+def log_lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+def test_handler_logs_summary_and_metrics(capsys):
+    event = {
+        "headers": {"accept": "image/png"},
+        "queryStringParameters": {"w": "20", "h": "10"},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+    app.lambda_handler(event, "")
+    summary, metrics = log_lines(capsys)
+    assert summary["queryStringParameters"] == {"w": "20", "h": "10"}
+    assert metrics["Function"] == "img_api"
+    assert metrics["Verb"] == "GET"
+    assert metrics["StatusCode"] == 200
+    for name in ("parse_query", "noise", "encode", "b64encode", "BytesOut", "ContainerPeakRSS", "PeakRSSGrowth"):
+        assert name in metrics
+    names = [metric["Name"] for metric in metrics["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+    assert "encode" in names and "Duration" in names
+
+def test_encode_stage_times_the_encoder(capsys, monkeypatch):
+    encode_view = app.encoder.encode_view
+    def slow_encode_view(*args, **kwargs):
+        time.sleep(0.05)
+        return encode_view(*args, **kwargs)
+    monkeypatch.setattr(app.encoder, "encode_view", slow_encode_view)
+    event = {
+        "headers": {"accept": "image/jpeg"},
+        "queryStringParameters": {"w": "20", "h": "10"},
+        "requestContext": {"http": {"method": "GET"}},
+    }
+    app.lambda_handler(event, "")
+    summary, metrics = log_lines(capsys)
+    assert metrics["encode"] >= 50
+
+def test_peak_rss_growth_is_per_invocation(capsys, monkeypatch):
+    # The container peak before and after each of two invocations
+    peaks = iter([100, 150, 150, 150])
+    monkeypatch.setattr(instrument, "peak_rss", lambda: next(peaks))
+    echo_raw.lambda_handler({"body": "x"}, "")
+    echo_raw.lambda_handler({"body": "x"}, "")
+    first, second = log_lines(capsys)[1::2]
+    assert (first["ContainerPeakRSS"], first["PeakRSSGrowth"]) == (150, 50)
+    assert (second["ContainerPeakRSS"], second["PeakRSSGrowth"]) == (150, 0)
+
+def test_handler_never_logs_body(capsys):
+    event = {"requestContext": {"http": {"method": "POST"}}, "body": BODY, "isBase64Encoded": True}
+    echo_raw.lambda_handler(event, "")
+    output = capsys.readouterr().out
+    assert BODY not in output
+    summary, metrics = [json.loads(line) for line in output.splitlines()]
+    assert summary["body"]["length"] == len(BODY)
+    assert metrics["BytesIn"] == len(BODY)
+
+def test_stage_outside_invocation_is_ignored():
+    with instrument.stage("nothing"):
+        pass
+    instrument.put_metric("nothing", 1)
+
+def test_tracemalloc_profile(capsys, monkeypatch):
+    monkeypatch.setattr(instrument, "profile", "tracemalloc")
+    echo_raw.lambda_handler({"body": "x"}, "")
+    lines = log_lines(capsys)
+    assert "peak" in lines[1]["tracemalloc"]
+    assert lines[2]["Function"] == "echo_raw"
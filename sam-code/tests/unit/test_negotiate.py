@@ -0,0 +1,71 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+import negotiate
+
+OFFERED = ("image/jpeg", "image/png", "image/gif", "image/webp", "image/avif")
+
+@pytest.mark.parametrize("accept,expected", [
+    ("*/*", "image/jpeg"),
+    ("image/png", "image/png"),
+    ("IMAGE/PNG; charset=x", "image/png"),
+    ("text/html,image/gif", "image/gif"),
+    ("image/avif,image/webp,*/*", "image/jpeg"),
+    ("image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8", "image/jpeg"),
+    ("image/avif,image/webp", "image/webp"),
+    ("image/avif,image/webp,*/*;q=0.8", "image/webp"),
+    ("image/png,*/*", "image/jpeg"),
+    ("text/html,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8", "image/webp"),
+    ("image/webp;q=0.5,image/png;q=0.9", "image/png"),
+    ("*/*;q=0.1,image/gif", "image/gif"),
+    ("image/*", "image/jpeg"),
+    ("image/*,image/jpeg;q=0", "image/png"),
+    ("image/jpeg;q=0", "unknown/unknown"),
+    ("*/*;q=0", "unknown/unknown"),
+    ("text/html", "unknown/unknown"),
+    ("", "unknown/unknown"),
+])
+def test_best_match(accept, expected):
+    assert negotiate.best_match(accept, OFFERED) == expected
+
+def test_wildcards_follow_offered_order():
+    assert negotiate.best_match("*/*", ("image/png", "image/jpeg")) == "image/png"
+
+def test_invalid_q_counts_as_one():
+    assert negotiate.parse_accept("image/png;q=x,image/gif;q=2") == (("image/png", 1.0), ("image/gif", 1.0))
+
+def test_parsed_headers_are_memoized():
+    negotiate.parse_accept.cache_clear()
+    negotiate.parse_accept("image/png,*/*;q=0.5")
+    negotiate.parse_accept("image/png,*/*;q=0.5")
+    assert negotiate.parse_accept.cache_info().hits == 1
+
+def test_ranked_matches():
+    assert negotiate.ranked_matches("image/png,*/*;q=0.5,image/gif;q=0", OFFERED) == (
+        "image/png", "image/jpeg", "image/webp", "image/avif")
+
+@pytest.mark.parametrize("accept,expected", [
+    ("image/avif,image/webp,*/*", "image/webp"),
+    ("image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8", "image/webp"),
+    ("image/avif,*/*", "image/avif"),
+    ("image/png,*/*", "image/png"),
+    ("*/*", "image/jpeg"),
+    ("image/webp;q=0.5,*/*", "image/jpeg"),
+])
+def test_explicit_first(accept, expected):
+    offered = ("image/jpeg", "image/webp", "image/avif", "image/png", "image/gif")
+    assert negotiate.best_match(accept, offered, explicit_first=True) == expected
@@ -0,0 +1,47 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import pytest
+
+import noise
+
+@pytest.mark.parametrize("engine", sorted(noise.engines))
+def test_noise_range(engine):
+    data = noise.noise_bytes(10000,192,240,engine=engine)
+    assert len(data) == 10000
+    assert min(data) >= 192
+    assert max(data) <= 239
+
+@pytest.mark.parametrize("engine", sorted(noise.engines))
+def test_noise_inverted_range(engine):
+    data = noise.noise_bytes(10000,200,100,engine=engine)
+    assert min(data) >= 101
+    assert max(data) <= 200
+
+@pytest.mark.parametrize("engine", sorted(set(noise.engines) - {"python"}))
+def test_noise_seeded_and_addressable(engine):
+    full = noise.noise_bytes(1000,0,255,seed=42,engine=engine)
+    assert full == noise.noise_bytes(1000,0,255,seed=42,engine=engine)
+    assert full != noise.noise_bytes(1000,0,255,seed=43,engine=engine)
+    assert full[333:777] == noise.noise_bytes(444,0,255,seed=42,offset=333,engine=engine)
+
+@pytest.mark.parametrize("engine", sorted(noise.engines))
+def test_noise_negative_seed(engine):
+    assert noise.noise_bytes(100,0,255,seed=-1,engine=engine) == noise.noise_bytes(100,0,255,seed=-1,engine=engine)
+    assert noise.noise_bytes(100,0,255,seed=-1,engine=engine) != noise.noise_bytes(100,0,255,seed=1,engine=engine)
+
+def test_noise_out_of_range():
+    with pytest.raises(ValueError):
+        noise.noise_bytes(10,0,300)
@@ -0,0 +1,106 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import time
+
+import pytest
+
+import result_cache
+from img_api import app
+from base64  import b64encode
+
+TESTDATA_DIR = os.path.realpath(
+    os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        '../../../testdata'
+    ))
+
+@pytest.fixture
+def remote(monkeypatch, tmp_path):
+    monkeypatch.setattr(result_cache, "disk", result_cache.DirectoryTier(str(tmp_path / "disk"), 1 << 20))
+    monkeypatch.setattr(result_cache, "remote", result_cache.MemoryTier())
+    return result_cache.remote
+
+def post_event(seed=None):
+    with open(os.path.join(TESTDATA_DIR,'rainbow-small.jpg'),'rb') as fh:
+        body = b64encode(fh.read()).decode('ascii')
+    event = {
+        "headers": {"accept": "image/png", "content-type": "image/jpeg"},
+        "queryStringParameters": {"min": "10", "max": "100"},
+        "requestContext": {"http": {"method": "POST"}},
+        "body": body,
+        "isBase64Encoded": True,
+    }
+    if seed is not None:
+        event["queryStringParameters"]["seed"] = str(seed)
+    return event
+
+def test_directory_tier_evicts_least_recently_used(tmp_path):
+    tier = result_cache.DirectoryTier(str(tmp_path), 10)
+    tier.put("a", b"1234")
+    tier.put("b", b"1234")
+    # mtime resolution can be coarse, make the order explicit
+    os.utime(tmp_path / "a", (time.time() - 10, time.time() - 10))
+    tier.put("c", b"1234")
+    assert tier.get("a") is None
+    assert tier.get("b") == b"1234"
+    assert tier.get("c") == b"1234"
+
+def test_seeded_post_is_served_from_cache(remote, mocker):
+    first = app.lambda_handler(post_event(seed=3), "")
+    decode = mocker.spy(app, "decode_img")
+    second = app.lambda_handler(post_event(seed=3), "")
+    assert decode.call_count == 0
+    assert second == first
+    assert len(remote.entries) == 1
+
+def test_remote_hit_fills_disk_tier(remote, mocker, tmp_path):
+    first = app.lambda_handler(post_event(seed=3), "")
+    for entry in os.scandir(result_cache.disk.path):
+        os.remove(entry.path)
+    decode = mocker.spy(app, "decode_img")
+    assert app.lambda_handler(post_event(seed=3), "") == first
+    assert decode.call_count == 0
+    assert len(os.listdir(result_cache.disk.path)) == 1
+
+def test_unseeded_post_is_not_cached(remote):
+    app.lambda_handler(post_event(), "")
+    assert remote.entries == {}
+
+class S3Error(Exception):
+    pass
+
+class FailingS3Client:
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def get_object(self, **kwargs):
+        raise S3Error("AccessDenied")
+
+    def put_object(self, **kwargs):
+        raise S3Error("SlowDown")
+
+def test_s3_errors_do_not_fail_requests(monkeypatch, capsys):
+    tier = result_cache.S3Tier.__new__(result_cache.S3Tier)
+    tier.client, tier.bucket, tier.prefix, tier.errors = FailingS3Client(), "bucket", "noise-cache/", (S3Error,)
+    monkeypatch.setattr(result_cache, "disk", None)
+    monkeypatch.setattr(result_cache, "remote", tier)
+    for _ in range(2):
+        assert app.lambda_handler(post_event(seed=1), "")["statusCode"] == 200
+    output = capsys.readouterr().out
+    assert "S3 get" in output and "AccessDenied" in output
+    assert "S3 put" in output and "SlowDown" in output
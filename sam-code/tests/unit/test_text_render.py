@@ -0,0 +1,61 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+import text_render
+
+TESTDATA_DIR = os.path.realpath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'testdata'))
+
+@pytest.fixture
+def atlas():
+    return text_render.GlyphAtlas(ImageFont.load_default())
+
+def test_wrap_fits_width(atlas):
+    lines = list(text_render.wrap("aaaa bbbb " + "c" * 40 + " d\n\nnext", 60, atlas))
+    assert lines[0] == "aaaa bbbb"
+    assert "".join(lines[1:]).replace(" ", "") == "c" * 40 + "d" + "next"
+    assert lines[-2:] == ["", "next"]
+    assert all(atlas.width(line) <= 60 for line in lines)
+
+def test_render_grows_with_text(atlas):
+    text = "\n".join(["line"] * 40)
+    image = text_render.render(text, 100, 50, atlas)
+    assert image.size == (100, 40 * atlas.line_height)
+    assert text_render.render("short", 100, 50, atlas).size == (100, 50)
+
+def test_render_height_is_capped(atlas, monkeypatch):
+    monkeypatch.setattr(text_render, "max_height", 100)
+    image = text_render.render("line\n" * 1000, 100, 50, atlas)
+    assert image.size == (100, 100 // atlas.line_height * atlas.line_height)
+
+def test_glyphs_are_rasterized_once(atlas):
+    text_render.render("hello world", 100, 20, atlas)
+    glyphs = dict(atlas.glyphs)
+    text_render.render("hello world, hello", 100, 20, atlas)
+    assert all(atlas.glyphs[char] is glyphs[char] for char in glyphs)
+    assert set(atlas.glyphs) == set("helo wrd,")
+
+def test_render_matches_multiline_text(atlas):
+    with open(os.path.join(TESTDATA_DIR, 'multiline.txt')) as fh:
+        text = fh.read()
+    image = text_render.render(text, 200, 100, atlas)
+    expected = Image.new('L', image.size, 255)
+    ImageDraw.Draw(expected).multiline_text((0,0), text, fill=0, font=atlas.font)
+    difference = ImageChops.difference(image, expected).point(lambda value: 255 if value > 64 else 0)
+    assert difference.histogram()[255] < 50
@@ -0,0 +1,81 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this
+# software and associated documentation files (the "Software"), to deal in the Software
+# without restriction, including without limitation the rights to use, copy, modify,
+# merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+# INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+# PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+
+import pytest
+
+import tile_cache
+from img_api import app
+from base64  import b64decode
+
+EVENTS_DIR = os.path.realpath(
+    os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        '../../events'
+    ))
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(tile_cache, "cache", tile_cache.ByteLRU(1 << 20))
+    return tile_cache.cache
+
+def test_byte_lru_evicts_least_recently_used():
+    lru = tile_cache.ByteLRU(10)
+    lru.put("a", "a", 4)
+    lru.put("b", "b", 4)
+    assert lru.get("a") == "a"
+    lru.put("c", "c", 4)
+    assert lru.get("b") is None
+    assert lru.get("a") == "a"
+    assert lru.stats()["evictions"] == 1
+    assert lru.stats()["bytes"] == 8
+    lru.put("d", "d", 11)
+    assert lru.get("d") is None
+
+@pytest.mark.datafiles(os.path.join(EVENTS_DIR,'event_png_size_and_greyscale.json'))
+def test_lambda_handler_rotates_through_pool(datafiles, cache, monkeypatch):
+    monkeypatch.setattr(tile_cache, "pool_size", 2)
+    with open(os.path.join(datafiles,'event_png_size_and_greyscale.json')) as fh:
+        event = json.load(fh)
+    bodies = [b64decode(app.lambda_handler(event, "")["body"]) for _ in range(4)]
+    assert bodies[0] == bodies[2]
+    assert bodies[1] == bodies[3]
+    assert bodies[0] != bodies[1]
+    assert cache.stats()["entries"] == 3
+
+@pytest.mark.datafiles(os.path.join(EVENTS_DIR,'event_png_size_and_greyscale.json'))
+def test_lambda_handler_seeded_uses_single_tile(datafiles, cache):
+    with open(os.path.join(datafiles,'event_png_size_and_greyscale.json')) as fh:
+        event = json.load(fh)
+    event["queryStringParameters"]["seed"] = "7"
+    bodies = [app.lambda_handler(event, "")["body"] for _ in range(3)]
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert cache.stats()["entries"] == 2
+
+@pytest.mark.datafiles(os.path.join(EVENTS_DIR,'event_png_size_and_greyscale.json'))
+def test_pool_and_payload_lookups_are_counted_apart(datafiles, cache):
+    with open(os.path.join(datafiles,'event_png_size_and_greyscale.json')) as fh:
+        event = json.load(fh)
+    event["queryStringParameters"]["seed"] = "7"
+    event["headers"]["accept"] = "image/png"
+    app.lambda_handler(event, "")
+    event["headers"]["accept"] = "image/png;q=0.9,text/html"
+    app.lambda_handler(event, "")
+    stats = cache.stats()
+    assert (stats["pool_hits"], stats["pool_misses"]) == (1, 1)
+    assert (stats["payload_hits"], stats["payload_misses"]) == (1, 1)
+    assert stats["entries"] == 2